@@ -1,5 +1,5 @@
 import { getUserData, saveUserData, fetchNowPlaying, createText, getReplyMarkup } from '../utils.mjs';
-import { getYouTubeMusicDetails } from '../youtube.mjs';
+import { getYouTubeMusicDetailsBatch } from '../youtube.mjs';
 
 export async function chPlaying(bot) {
     try {
@@ -8,16 +8,33 @@ export async function chPlaying(bot) {
             return; // Silently return if no users or database error
         }
         
+        const nowPlaying = [];
         for (const user of users) {
             try {
                 const track = await fetchNowPlaying(user.userId);
                 if (track) {
-                    let details = await getYouTubeMusicDetails(track.artistName, track.trackName, track.albumName);
+                    nowPlaying.push({ user, track });
+                }
+            } catch (error) {
+                console.error(`Error fetching now playing for user ${user.userId}:`, error.message);
+            }
+        }
 
-                    if (!details) {
-                        continue;
-                    }
+        if (nowPlaying.length === 0) {
+            return;
+        }
 
+        // Resolve every user's track in one round-trip to the YouTube Music API
+        const allDetails = await getYouTubeMusicDetailsBatch(nowPlaying.map(({ track }) => ({
+            artist: track.artistName,
+            track: track.trackName,
+            album: track.albumName
+        })));
+
+        for (const [index, { user, track }] of nowPlaying.entries()) {
+            try {
+                const details = allDetails[index];
+                if (details) {
                     const { albumCover, id } = details;
                     const text = createText({ ...track, ...user });
                     const replyMarkup = getReplyMarkup({ id, artistName: track.artistName });
@@ -1,11 +1,21 @@
 import dotenv from 'dotenv';
 import { getIndividualUserData } from './utils.mjs';
+import { warmYouTubeMusicCache } from './youtube.mjs';
 
 dotenv.config();
 
 const lastfmApiKey = process.env.LASTFM_API_KEY;
 const lastfmBaseUrl = 'http://ws.audioscrobbler.com/2.0/';
 
+// Let the YouTube Music service resolve tracks a user is likely to play before they are posted
+function warmTracks(tracks) {
+    warmYouTubeMusicCache(tracks.map((track) => ({
+        artist: track.artist?.['#text'] || track.artist?.name || '',
+        track: track.name,
+        album: track.album?.['#text'] || ''
+    })));
+}
+
 // Helper function to make Last.fm API requests
 async function makeLastfmRequest(method, params = {}) {
     const url = new URL(lastfmBaseUrl);
@@ -130,6 +140,7 @@ export async function getUserRecentTracks(userId, limit = 10, from = null, to =
         const tracks = Array.isArray(data.recenttracks.track) 
             ? data.recenttracks.track 
             : [data.recenttracks.track];
+        warmTracks(tracks);
 
         return {
             success: true,
@@ -165,6 +176,7 @@ export async function getUserLovedTracks(userId, limit = 10) {
         const tracks = Array.isArray(data.lovedtracks.track) 
             ? data.lovedtracks.track 
             : [data.lovedtracks.track];
+        warmTracks(tracks);
 
         return {
             success: true,
@@ -4,8 +4,11 @@ import dotenv from 'dotenv';
 dotenv.config();
 
 const YTMUSIC_API_URL = process.env.YTMUSIC_API_URL || 'http://127.0.0.1:8080';
+const BATCH_SIZE = 50; // Matches the server's default YTMUSIC_BATCH_MAX_SIZE
+const WARM_SIZE = 200; // Matches the server's default YTMUSIC_WARM_MAX_SIZE
+const RESULT_FIELDS = 'videoId,thumbnail,title,artists,album'; // All toTrackDetails reads
 
-async function getYouTubeMusicDetails(artist, track, album = '') {
+function buildSearchString(artist, track, album = '') {
     const sanitizeForQuery = (str) => {
         if (!str) return '';
         return str.trim();
@@ -21,62 +24,125 @@ async function getYouTubeMusicDetails(artist, track, album = '') {
         searchString += ` ${sanitizedAlbum}`;
     }
     
-    if (!searchString || searchString.trim().length < 1) {
+    return searchString.trim();
+}
+
+function toTrackDetails(data) {
+    if (!data || data.error) {
+        return null;
+    }
+    
+    if (!data.results || data.results.length === 0) {
+        return null;
+    }
+    
+    const firstResult = data.results[0];
+    
+    // The service picks and verifies the cover; see thumbnails.py
+    return {
+        id: firstResult.videoId,
+        albumCover: firstResult.thumbnail || null,
+        title: firstResult.title || null,
+        artists: firstResult.artists || [],
+        album: firstResult.album || null
+    };
+}
+
+function logApiError(error) {
+    if (error.code === 'ECONNREFUSED') {
+        console.error('YouTube Music API server is not running. Please start the server with: python3 src/ytmusic/server.py');
+    } else if (error.response) {
+        console.error('YouTube Music API error:', error.response.data?.error || error.message);
+    } else {
+        console.error('YouTube Music API error:', error.message);
+    }
+}
+
+async function getYouTubeMusicDetails(artist, track, album = '') {
+    const searchString = buildSearchString(artist, track, album);
+    
+    if (!searchString || searchString.length < 1) {
         return null;
     }
     
     try {
         const response = await axios.get(`${YTMUSIC_API_URL}/search`, {
-            params: { q: searchString },
+            params: { q: searchString, priority: 'interactive', fields: RESULT_FIELDS },
             timeout: 15000,
             headers: {
                 'Content-Type': 'application/json'
             }
         });
         
-        const data = response.data;
-        
-        if (data.error) {
-            return null;
-        }
-        
-        if (!data.results || data.results.length === 0) {
-            return null;
+        return toTrackDetails(response.data);
+    } catch (error) {
+        logApiError(error);
+        return null;
+    }
+}
+
+// Resolves many { artist, track, album } entries in one round-trip; results keep input order
+async function getYouTubeMusicDetailsBatch(tracks) {
+    const details = tracks.map(() => null);
+    const queries = [];
+    const positions = [];
+    
+    tracks.forEach(({ artist, track, album }, index) => {
+        const searchString = buildSearchString(artist, track, album);
+        if (searchString) {
+            queries.push(searchString);
+            positions.push(index);
         }
-        
-        const firstResult = data.results[0];
-        
-        let albumCover = firstResult.thumbnail;
-        
-        if (!albumCover && firstResult.thumbnails && firstResult.thumbnails.length > 0) {
-            const sortedThumbnails = firstResult.thumbnails.sort((a, b) => 
-                (b.width * b.height) - (a.width * a.height)
-            );
+    });
+    
+    if (queries.length === 0) {
+        return details;
+    }
+    
+    for (let start = 0; start < queries.length; start += BATCH_SIZE) {
+        try {
+            const response = await axios.post(`${YTMUSIC_API_URL}/search/batch`, {
+                queries: queries.slice(start, start + BATCH_SIZE),
+                priority: 'background',
+                fields: RESULT_FIELDS
+            }, {
+                timeout: 15000,
+                headers: {
+                    'Content-Type': 'application/json'
+                }
+            });
             
-            const bestThumbnail = sortedThumbnails[0];
-            albumCover = bestThumbnail.url
-                .replace(/w\d+-h\d+/, 'w1080-h1080')
-                .replace(/mqdefault/, 'maxresdefault')
-                .replace(/hqdefault/, 'maxresdefault');
+            const results = response.data?.results || [];
+            results.forEach((result, i) => {
+                details[positions[start + i]] = toTrackDetails(result);
+            });
+        } catch (error) {
+            logApiError(error);
         }
-        
-        return {
-            id: firstResult.videoId,
-            albumCover: albumCover,
-            title: firstResult.title || null,
-            artists: firstResult.artists || [],
-            album: firstResult.album || null
-        };
+    }
+    
+    return details;
+}
+
+// Asks the service to resolve { artist, track, album } entries in the background; never throws
+async function warmYouTubeMusicCache(tracks) {
+    const entries = tracks.filter(({ artist, track }) => artist && track);
+    if (entries.length === 0) {
+        return;
+    }
+    
+    try {
+        await axios.post(`${YTMUSIC_API_URL}/warm`, {
+            tracks: entries.slice(0, WARM_SIZE)
+        }, {
+            timeout: 5000,
+            headers: {
+                'Content-Type': 'application/json'
+            }
+        });
     } catch (error) {
-        if (error.code === 'ECONNREFUSED') {
-            console.error('YouTube Music API server is not running. Please start the server with: python3 src/ytmusic/server.py');
-        } else if (error.response) {
-            console.error('YouTube Music API error:', error.response.data?.error || error.message);
-        } else {
-            console.error('YouTube Music API error:', error.message);
-        }
-        return null;
+        logApiError(error);
     }
 }
 
-export { getYouTubeMusicDetails };
+export { getYouTubeMusicDetails, getYouTubeMusicDetailsBatch, warmYouTubeMusicCache };
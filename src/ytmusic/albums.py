@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Album prefetch for the YouTube Music search service
+Users mostly scrobble whole albums in order, and every track query has the form
+"<title> <artist> <album>". Once one track of an album resolves confidently, the album's full
+track listing is fetched in the background and indexed by "<artist> <album>" and title, so the
+album's other tracks are answered without searching YouTube Music at all.
+"""
+
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from cache import TTLCache
+from thumbnails import best_thumbnail
+
+# "Yesterday (Remastered 2009)", "Song [Live]", "Song - 2011 Remaster" also match plain "Song"
+DECORATION_PATTERN = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]')
+
+
+def album_tracks(browse_id: str, album: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Search-result shaped tracks of a get_album() response, covered with the album art"""
+    best = best_thumbnail(album.get('thumbnails') or [])
+    name = album.get('title', '')
+    tracks = []
+    for track in album.get('tracks') or []:
+        if not track.get('videoId') or track.get('isAvailable') is False:
+            continue
+        tracks.append({
+            "videoId": track['videoId'],
+            "title": track.get('title', '') or '',
+            "artists": [{"name": artist.get('name', '')} for artist in track.get('artists') or album.get('artists') or []],
+            "album": {"name": name, "id": browse_id},
+            "duration_seconds": track.get('duration_seconds'),
+            "thumbnails": [best] if best else [],
+            "resultType": "song"
+        })
+    return tracks
+
+
+class AlbumIndex:
+    """Tracks of prefetched albums, keyed by the "<artist> <album>" ending of a query, then by title"""
+
+    def __init__(self, normalize: Callable[[str], str], maxsize: int = 2000, ttl: float = 86400,
+                 retry_after: float = 300):
+        self.normalize = normalize
+        # One entry per artist/album spelling; the spellings of one album share its title map
+        self.suffixes = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Albums fetched recently, so a track that misses the index does not fetch its album again;
+        # failed fetches are retried after retry_after
+        self.fetched = TTLCache(maxsize=maxsize, ttl=ttl, negative_ttl=retry_after)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.albums = 0
+        self.tracks = 0
+
+    def key(self, text: str) -> str:
+        return self.normalize(text).lower()
+
+    def title_keys(self, title: str) -> List[str]:
+        """Keys of a title as given and without decorations such as '(Remastered)'"""
+        plain = DECORATION_PATTERN.sub('', title).split(' - ')[0]
+        return list(dict.fromkeys(key for key in (self.key(title), self.key(plain)) if key))
+
+    def known(self, browse_id: str) -> bool:
+        return browse_id in self.fetched
+
+    def failed(self, browse_id: str) -> None:
+        self.fetched.set(browse_id, False, negative=True)
+
+    def add(self, browse_id: str, album: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Index an album's tracks; returns them"""
+        tracks = album_tracks(browse_id, album)
+        by_title: Dict[str, Dict[str, Any]] = {}
+        artists = {artist.get('name', '') for artist in album.get('artists') or []}
+        for track in tracks:
+            for title_key in self.title_keys(track['title']):
+                by_title.setdefault(title_key, track)
+            artists.update(artist['name'] for artist in track['artists'][:1])
+
+        self.fetched.set(browse_id, True)
+        if by_title:
+            for artist in filter(None, map(self.key, artists)):
+                for name in self.title_keys(album.get('title', '')):
+                    self.suffixes.set(f"{artist} {name}", by_title)
+        with self._lock:
+            self.albums += 1
+            self.tracks += len(tracks)
+        return tracks
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """The prefetched track a "<title> <artist> <album>" query asks for, if its album is indexed"""
+        words = self.key(query).split()
+        with self._lock:
+            self.lookups += 1
+        for split in range(1, len(words)):
+            # Peek without touching the cache counters; most endings are not album names
+            by_title = self.suffixes.get_stale(' '.join(words[split:]), max_age=0)
+            if by_title is None:
+                continue
+            track = by_title.get(' '.join(words[:split]))
+            if track is not None:
+                self.suffixes.get(' '.join(words[split:]))
+                with self._lock:
+                    self.hits += 1
+                return track
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "albums": self.albums,
+            "tracks": self.tracks,
+            "indexed": len(self.suffixes),
+            "maxSize": self.suffixes.maxsize,
+            "ttl": self.suffixes.ttl,
+            "lookups": self.lookups,
+            # Each hit is at least one upstream search saved
+            "hits": self.hits,
+            "hitRatio": round(self.hits / self.lookups, 3) if self.lookups else 0.0
+        }
@@ -1,246 +1,128 @@
 #!/usr/bin/env python3
 
-from ytmusicapi import YTMusic
 import json
 import sys
-import re
+import os
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any
 
 logging.basicConfig(level=logging.ERROR)  # Changed from WARNING to ERROR
 logger = logging.getLogger(__name__)
 
-class YTMusicSearcher:
-    def __init__(self):
-        try:
-            self.ytmusic = YTMusic()
-        except Exception as e:
-            logger.error(f"Failed to initialize YTMusic: {e}")
-            self.ytmusic = None
+_searcher = None
+
+def get_searcher():
+    """Shared searcher, created on first use and reused by every later lookup"""
+    global _searcher
+    if _searcher is None:
+        # Imported here so `--help`, usage errors and the stream loop start without paying for it
+        from engine import YTMusicSearcher
+        _searcher = YTMusicSearcher()
+    return _searcher
+
+def simple_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a detailed result to the backward compatible single-result format"""
+    from engine import simple_result as engine_simple_result
+    return engine_simple_result(result)
+
+def search_ytmusic(query: str) -> Dict[str, Any]:
+    """Wrapper function for backward compatibility"""
+    return simple_result(get_searcher().search_ytmusic(query))
+
+def handle_line(line: str) -> Optional[Dict[str, Any]]:
+    """Answer one request of the JSON-lines protocol
+
+    A line is either a JSON object {"query": "...", "id": ..., "detailed": false} or a plain
+    search string. The response echoes "id" when one was given.
+    """
+    line = line.strip()
+    if not line:
+        return None
     
-    def normalize_query(self, query: str) -> str:
-        """Normalize search query for better matching while preserving Unicode"""
-        query = re.sub(r'[^\w\s\-\u00C0-\u017F\u0400-\u04FF\u0600-\u06FF\u4E00-\u9FFF\u3040-\u309F\u30A0-\u30FF\uAC00-\uD7AF]', ' ', query, flags=re.UNICODE)
-        query = re.sub(r'\s+', ' ', query).strip()
-        return query
+    request_id = None
+    detailed = False
+    if line.startswith('{'):
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            return {"error": f"Invalid JSON request: {str(e)}"}
+        query = str(payload.get('query', '')).strip()
+        request_id = payload.get('id')
+        detailed = bool(payload.get('detailed', False))
+    else:
+        query = line
     
-    def extract_best_thumbnail(self, thumbnails: List[Dict]) -> Optional[str]:
-        """Extract the best quality thumbnail URL"""
-        if not thumbnails:
-            return None
-        
-        sorted_thumbnails = sorted(
-            thumbnails, 
-            key=lambda x: (x.get('width', 0) * x.get('height', 0)), 
-            reverse=True
-        )
-        
-        best_thumbnail = sorted_thumbnails[0]
-        thumbnail_url = best_thumbnail.get('url', '')
-        
-        if thumbnail_url:
-            thumbnail_url = re.sub(r'w\d+-h\d+', 'w1080-h1080', thumbnail_url)
-            if 'mqdefault' in thumbnail_url:
-                thumbnail_url = thumbnail_url.replace('mqdefault', 'maxresdefault')
-            elif 'hqdefault' in thumbnail_url:
-                thumbnail_url = thumbnail_url.replace('hqdefault', 'maxresdefault')
-        
-        return thumbnail_url
+    if not query:
+        response = {"error": "Search query is empty"}
+    else:
+        try:
+            result = get_searcher().search_ytmusic(query)
+            response = result if detailed else simple_result(result)
+        except Exception as e:
+            response = {"error": f"Unexpected error: {str(e)}"}
     
-    def parse_search_components(self, query: str) -> Dict[str, str]:
-        """Try to parse track, artist, and album from the search query"""
-        components = {
-            'track': '',
-            'artist': '',
-            'album': '',
-            'full_query': query.strip()
-        }
+    if request_id is not None:
+        response = dict(response, id=request_id)
+    return response
 
-        components['full_query'] = self.normalize_query(query)
-        
-        return components
+def serve_stream(infile, outfile) -> None:
+    """Persistent mode: read requests line by line, write one JSON response line each"""
+    for line in infile:
+        response = handle_line(line)
+        if response is None:
+            continue
+        outfile.write(json.dumps(response, ensure_ascii=False) + "\n")
+        outfile.flush()
+
+def serve_socket(path: str) -> None:
+    """Daemon mode: the JSON-lines protocol over a Unix socket, one thread per connection"""
+    import socketserver
     
-    def search_with_fallbacks(self, query: str) -> List[Dict[str, Any]]:
-        """Search with multiple strategies for better accuracy"""
-        components = self.parse_search_components(query)
-        search_query = components['full_query']
-        
-        search_strategies = [
-            {'filter': 'songs', 'limit': 5},
-            {'filter': 'videos', 'limit': 3},
-            {'filter': None, 'limit': 2}
-        ]
-        
-        for strategy in search_strategies:
-            try:
-                filter_type = strategy.get('filter')
-                limit = strategy.get('limit', 5)
-                
-                results = self.ytmusic.search(
-                    search_query, 
-                    filter=filter_type, 
-                    limit=limit
-                )
-                
-                if results and len(results) > 0:
-                    music_results = [
-                        r for r in results 
-                        if r.get('videoId') and r.get('title') and 
-                        not r.get('resultType') in ['playlist', 'channel', 'podcast']
-                    ]
-                    
-                    if music_results:
-                        return music_results
-                    
-            except Exception as e:
-                logger.warning(f"Search strategy {strategy} failed: {e}")
-                continue
-        
-        return []
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            infile = (line.decode('utf-8', errors='replace') for line in self.rfile)
+            for line in infile:
+                response = handle_line(line)
+                if response is None:
+                    continue
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+                self.wfile.flush()
     
-    def score_result_relevance(self, result: Dict, original_query: str) -> float:
-        """Enhanced scoring for track + artist + album queries"""
-        score = 0.0
-        query_lower = original_query.lower()
-        query_words = set(query_lower.split())
-        
-        title = result.get('title', '').lower()
-        if title:
-            if query_lower in title or title in query_lower:
-                score += 0.6
-            
-            title_words = set(title.split())
-            word_overlap = len(query_words.intersection(title_words))
-            if query_words:
-                score += (word_overlap / len(query_words)) * 0.4
-        
-        artists = result.get('artists', [])
-        if artists:
-            artist_names = ' '.join([artist.get('name', '') for artist in artists]).lower()
-            if artist_names:
-                artist_words = set(artist_names.split())
-                artist_overlap = len(query_words.intersection(artist_words))
-                if query_words:
-                    score += (artist_overlap / len(query_words)) * 0.3
-                
-                for artist in artists:
-                    artist_name = artist.get('name', '').lower()
-                    if artist_name and artist_name in query_lower:
-                        score += 0.2
-        
-        album_info = result.get('album')
-        if album_info and isinstance(album_info, dict):
-            album_name = album_info.get('name', '').lower()
-            if album_name:
-                album_words = set(album_name.split())
-                album_overlap = len(query_words.intersection(album_words))
-                if query_words:
-                    score += (album_overlap / len(query_words)) * 0.15
-        
-        if len(title) > 100:
-            score *= 0.9
-        
-        if result.get('duration_seconds'):
-            score += 0.05
-            
-        return min(score, 1.0)
+    if os.path.exists(path):
+        os.unlink(path)
     
-    def search_ytmusic(self, query: str) -> Dict[str, Any]:
-        """Enhanced search function with better accuracy and cover art"""
+    get_searcher()
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as daemon:
+        daemon.daemon_threads = True
         try:
-            if not self.ytmusic:
-                return {"error": "YTMusic API not initialized"}
-            
-            if not query or len(query.strip()) < 2:
-                return {"error": "Query too short"}
-            
-            components = self.parse_search_components(query)
-            
-            results = self.search_with_fallbacks(query)
-            
-            if not results:
-                return {"results": [], "message": f"No results found for: {query}"}
-            
-            scored_results = []
-            for result in results:
-                score = self.score_result_relevance(result, query)
-                scored_results.append((score, result))
-            
-            scored_results.sort(key=lambda x: x[0], reverse=True)
-            
-            processed_results = []
-            for score, result in scored_results[:3]:
-                try:
-                    video_id = result.get('videoId')
-                    if not video_id:
-                        continue
-                    
-                    thumbnails = result.get('thumbnails', [])
-                    best_thumbnail = self.extract_best_thumbnail(thumbnails)
-                    
-                    artists_info = result.get('artists', [])
-                    artist_names = []
-                    if artists_info:
-                        artist_names = [artist.get('name', '') for artist in artists_info if artist.get('name')]
-                    
-                    processed_result = {
-                        "videoId": video_id,
-                        "title": result.get('title', ''),
-                        "artists": artist_names,
-                        "thumbnail": best_thumbnail,
-                        "thumbnails": thumbnails,
-                        "relevanceScore": round(score, 3),
-                        "duration": result.get('duration_seconds'),
-                        "album": result.get('album', {}).get('name') if result.get('album') else None,
-                        "resultType": result.get('resultType', 'song')
-                    }
-                    
-                    processed_results.append(processed_result)
-                    
-                except Exception as e:
-                    logger.warning(f"Error processing result: {e}")
-                    continue
-            
-            return {
-                "results": processed_results,
-                "query": query,
-                "totalFound": len(results),
-                "searchStrategy": "enhanced_track_artist_album"
-            }
-            
-        except Exception as e:
-            logger.error(f"Search error: {e}")
-            return {"error": f"Search failed: {str(e)}"}
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
 
-def search_ytmusic(query: str) -> Dict[str, Any]:
-    """Wrapper function for backward compatibility"""
-    searcher = YTMusicSearcher()
-    result = searcher.search_ytmusic(query)
-    
-    if "results" in result and result["results"]:
-        first_result = result["results"][0]
-        return {
-            "results": [{
-                "videoId": first_result["videoId"],
-                "thumbnails": first_result.get("thumbnails", []),
-                "title": first_result.get("title", ""),
-                "artists": first_result.get("artists", []),
-                "thumbnail": first_result.get("thumbnail"),
-                "album": first_result.get("album")
-            }]
-        }
-    
-    return result
+USAGE = "python api.py '<search_query>' | python api.py --serve | python api.py --socket <path>"
 
 if __name__ == "__main__":
     import locale
     locale.setlocale(locale.LC_ALL, '')
     
     if len(sys.argv) < 2:
-        error_response = {"error": "No search query provided", "usage": "python api.py '<search_query>'"}
+        error_response = {"error": "No search query provided", "usage": USAGE}
         print(json.dumps(error_response, ensure_ascii=False))
         sys.exit(0) 
     
+    if sys.argv[1] == '--serve':
+        serve_stream(sys.stdin, sys.stdout)
+        sys.exit(0)
+    
+    if sys.argv[1] == '--socket':
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "No socket path provided", "usage": USAGE}, ensure_ascii=False))
+            sys.exit(0)
+        serve_socket(sys.argv[2])
+        sys.exit(0)
+    
     try:
         query = " ".join(sys.argv[1:]) if len(sys.argv) > 2 else sys.argv[1]
         if isinstance(query, bytes):
@@ -255,6 +137,13 @@ if __name__ == "__main__":
         print(json.dumps(error_response, ensure_ascii=False))
         sys.exit(0)
     
+    # A one-shot lookup exits right away: skip background cover checks, stale refreshes, album prefetch and the
+    # store and catalog, whose open/close would cost more than the single search they could save
+    os.environ.setdefault('YTMUSIC_THUMBNAIL_VERIFY', '0')
+    os.environ.setdefault('YTMUSIC_CACHE_STALE_TTL', '0')
+    os.environ.setdefault('YTMUSIC_STORE_PATH', '')
+    os.environ.setdefault('YTMUSIC_CATALOG_PATH', '')
+    os.environ.setdefault('YTMUSIC_ALBUM_PREFETCH', '0')
     try:
         result = search_ytmusic(query.strip())
         print(json.dumps(result, ensure_ascii=False))
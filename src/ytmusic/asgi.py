@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the YouTube Music Search API
+Serves the same /health, /search, /search/detailed and /search/batch contract as the
+Flask app, but admits hundreds of concurrent searches per process instead of one per
+waitress thread. Select it with SERVER_MODE=asgi, or run `uvicorn asgi:app` directly.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+import prefork
+import server
+from scheduler import INTERACTIVE
+from serialization import dumps, parse_fields, project, NDJSON_MIMETYPE
+from server import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_INFLIGHT = int(os.environ.get('YTMUSIC_ASGI_MAX_INFLIGHT', 256))
+MAX_BODY_BYTES = 1024 * 1024
+
+ALLOWED_ORIGIN = re.compile(r'^http://(localhost|127\.0\.0\.1)(:\d+)?$')
+
+# ytmusicapi is synchronous, so upstream calls run on this pool while the event loop
+# keeps accepting connections; its size is the per-process in-flight search limit
+# and the size of the upstream connection pool
+executor = ThreadPoolExecutor(max_workers=MAX_INFLIGHT, thread_name_prefix='ytmusic-asgi')
+
+
+def configure_upstream() -> None:
+    """Rebuild the searcher's YTMusic client on a connection pool sized to MAX_INFLIGHT"""
+    server.get_searcher().build_upstream(MAX_INFLIGHT)
+
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def read_body(receive) -> bytes:
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def send_body(send, body: bytes, content_type: bytes, status: int = 200,
+                    headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'content-length', str(len(body)).encode()),
+        ] + (headers or [])
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, payload: Dict[str, Any], status: int = 200,
+                    headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    with metrics.timer('ytmusic_stage_seconds', stage='serialize'):
+        body = dumps(payload)
+    await send_body(send, body, b'application/json', status, headers)
+
+
+async def send_stream(send, chunks: Iterator[bytes], status: int = 200,
+                      headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    """Send each chunk as soon as the blocking iterator produces it"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', NDJSON_MIMETYPE.encode())] + (headers or [])
+    })
+    while True:
+        chunk = await run_blocking(next, chunks, None)
+        if chunk is None:
+            break
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def cors_headers(scope) -> List[Tuple[bytes, bytes]]:
+    """Mirror the Flask app's CORS policy: localhost origins only"""
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin-1')
+    if origin and ALLOWED_ORIGIN.match(origin):
+        return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+    return []
+
+
+ENDPOINTS = {'/search': 'search', '/search/detailed': 'search_detailed', '/search/batch': 'search_batch',
+             '/warm': 'warm'}
+
+
+Payload = Union[Dict[str, Any], Iterator[bytes]]
+
+
+async def handle_instrumented(scope, receive) -> Tuple[Payload, int]:
+    """handle(), counted and timed per endpoint like the Flask routes"""
+    endpoint = ENDPOINTS.get(scope['path'].rstrip('/'))
+    if endpoint is None or not metrics.enabled:
+        return await handle(scope, receive)
+
+    metrics.inc('ytmusic_requests_total', endpoint=endpoint)
+    metrics.inc('ytmusic_requests_in_flight', endpoint=endpoint)
+    started = time.perf_counter()
+    try:
+        return await handle(scope, receive)
+    finally:
+        metrics.inc('ytmusic_requests_in_flight', -1, endpoint=endpoint)
+        metrics.observe('ytmusic_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+
+
+async def handle(scope, receive) -> Tuple[Payload, int]:
+    """Route a request; returns (payload, status code), the payload being NDJSON chunks for streamed batches"""
+    path = scope['path'].rstrip('/') or '/'
+    method = scope['method']
+
+    data: Dict[str, Any] = {}
+    if method == 'POST':
+        body = await read_body(receive)
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return {"error": "Invalid JSON body"}, 400
+        if not isinstance(data, dict):
+            return {"error": "JSON body must be an object"}, 400
+
+    if path == '/health' and method == 'GET':
+        payload = await run_blocking(server.health_payload)
+        return payload, server.health_status_code(payload)
+
+    if path == '/warm' and method == 'POST':
+        return await run_blocking(server.warm_response, data)
+
+    if path == '/search/batch' and method == 'POST':
+        accept = dict(scope.get('headers', [])).get(b'accept', b'').decode('latin-1')
+        if server.wants_stream(data, accept) and not server.batch_options(data)[0]:
+            return server.batch_stream(data), 200
+        return await run_blocking(server.batch_response, data)
+
+    if path in ('/search', '/search/detailed') and method in ('GET', 'POST'):
+        if method == 'GET':
+            params = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+            query = params.get('q', [''])[0].strip()
+            priority = params.get('priority', [INTERACTIVE])[0]
+            fields = parse_fields(params.get('fields', [None])[0], params.get('compact', [None])[0])
+        else:
+            query = str(data.get('query', '')).strip()
+            priority = data.get('priority', INTERACTIVE)
+            fields = parse_fields(data.get('fields'), data.get('compact'))
+
+        if not query:
+            return {"error": "Query parameter 'q' or 'query' is required"}, 400
+
+        result = await run_blocking(server.get_searcher().search_ytmusic, query, priority)
+        if path == '/search':
+            return project(server.simple_result(result), fields), 200
+        return project(result, fields), 200
+
+    return {"error": "Endpoint not found"}, 404
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await run_blocking(configure_upstream)
+                await send({'type': 'lifespan.startup.complete'})
+                prefork.notify_ready()
+            elif message['type'] == 'lifespan.shutdown':
+                executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    headers = cors_headers(scope)
+    if scope['method'] == 'OPTIONS':
+        await send({
+            'type': 'http.response.start',
+            'status': 204,
+            'headers': headers + [
+                (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+                (b'access-control-allow-headers', b'Content-Type'),
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    if scope['path'] == '/metrics' and scope['method'] == 'GET' and metrics.enabled:
+        body = (await run_blocking(metrics.render)).encode('utf-8')
+        await send_body(send, body, b'text/plain; version=0.0.4', 200, headers)
+        return
+
+    try:
+        payload, status = await handle_instrumented(scope, receive)
+    except Exception as e:
+        metrics.inc('ytmusic_errors_total', where='asgi')
+        logger.error(f"ASGI endpoint error: {e}")
+        payload, status = {"error": f"Internal server error: {str(e)}"}, 500
+
+    if isinstance(payload, dict):
+        await send_json(send, payload, status, headers)
+    else:
+        await send_stream(send, payload, status, headers)
+
+
+def run(host: str = '127.0.0.1', port: int = 8080, sock=None, graceful_timeout: Optional[float] = None) -> None:
+    """Serve the ASGI app with uvicorn, on an inherited pre-fork socket when one is given"""
+    import uvicorn
+
+    if sock is not None:
+        # uvicorn stops accepting on SIGTERM and waits up to graceful_timeout for in-flight requests
+        uvicorn.run(app, fd=sock.fileno(), log_level='error', timeout_graceful_shutdown=graceful_timeout)
+    else:
+        uvicorn.run(app, host=host, port=port, log_level='error', backlog=2048)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Search backends for the YouTube Music search engine
+Anything with YTMusic's `search(query, filter=None, limit=20)` signature can serve searches, and
+`get_album(browseId)` for album prefetch:
+- live:   ytmusicapi's YTMusic on a pooled session
+- record: live, and every response is appended to a recording file
+- replay: answers only from a recording file, for deterministic offline benchmarks
+- fake:   answers from an in-memory track catalog, with optional simulated latency
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('live', 'record', 'replay', 'fake')
+# Backends that talk to YouTube Music and need an upstream session
+LIVE_BACKENDS = ('live', 'record')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RECORDING_PATH = os.path.join(BASE_DIR, 'bench', 'recordings.ndjson')
+DEFAULT_FAKE_CATALOG_PATH = os.path.join(BASE_DIR, 'bench', 'fixtures.json')
+
+RecordingKey = Tuple[str, Optional[str], int]
+
+
+def recording_key(query: str, filter: Optional[str], limit: int) -> RecordingKey:
+    return (query, filter, int(limit))
+
+
+class RecordingBackend:
+    """Passes searches through to another backend and appends each response to an NDJSON file"""
+
+    def __init__(self, backend, path: str):
+        self.backend = backend
+        self.path = path
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str, filter: Optional[str] = None, limit: int = 20, **kwargs) -> List[Dict[str, Any]]:
+        results = self.backend.search(query, filter=filter, limit=limit, **kwargs)
+        self._write({"query": query, "filter": filter, "limit": limit, "results": results})
+        return results
+
+    def get_album(self, browseId: str) -> Dict[str, Any]:
+        album = self.backend.get_album(browseId)
+        self._write({"browseId": browseId, "album": album})
+        return album
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self.calls += 1
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                logger.error(f"Failed to record response to {self.path}: {e}")
+
+
+class ReplayBackend:
+    """Serves recorded responses; searches that were never recorded return no results"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.calls = 0
+        self.misses = 0
+        self._responses: Dict[RecordingKey, List[Dict[str, Any]]] = {}
+        self._albums: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                # The latest recording of a search or album wins
+                if 'browseId' in entry:
+                    self._albums[entry['browseId']] = entry['album']
+                    continue
+                self._responses[recording_key(entry['query'], entry.get('filter'), entry.get('limit', 20))] = entry['results']
+
+    def search(self, query: str, filter: Optional[str] = None, limit: int = 20, **kwargs) -> List[Dict[str, Any]]:
+        results = self._responses.get(recording_key(query, filter, limit))
+        with self._lock:
+            self.calls += 1
+            if results is None:
+                self.misses += 1
+        return results or []
+
+    def get_album(self, browseId: str) -> Dict[str, Any]:
+        album = self._albums.get(browseId)
+        with self._lock:
+            self.calls += 1
+            if album is None:
+                self.misses += 1
+        if album is None:
+            raise LookupError(f"No recorded album {browseId}")
+        return album
+
+
+def format_duration(seconds: int) -> str:
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def to_search_result(track: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand a catalog entry into the shape ytmusicapi returns from search()"""
+    if track['resultType'] == 'video':
+        thumbnails = [
+            {"url": track['thumb'].replace('hqdefault', 'mqdefault'), "width": 320, "height": 180},
+            {"url": track['thumb'], "width": 480, "height": 360}
+        ]
+    else:
+        thumbnails = [
+            {"url": f"{track['thumb']}=w60-h60-l90-rj", "width": 60, "height": 60},
+            {"url": f"{track['thumb']}=w120-h120-l90-rj", "width": 120, "height": 120}
+        ]
+
+    return {
+        "category": "Songs" if track['resultType'] == 'song' else "Videos",
+        "resultType": track['resultType'],
+        "videoId": track['videoId'],
+        "title": track['title'],
+        "artists": [{"name": track['artist'], "id": track['artistId']}],
+        "album": {"name": track['album'], "id": track['albumId']} if track['album'] else None,
+        "duration": format_duration(track['duration']),
+        "duration_seconds": track['duration'],
+        "isExplicit": False,
+        "thumbnails": thumbnails
+    }
+
+
+def load_tracks(path: str) -> List[Dict[str, Any]]:
+    """Track catalog in the bench/fixtures.json format"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['tracks']
+
+
+class FakeBackend:
+    """Answers search() from an in-memory track catalog with optional simulated upstream latency"""
+
+    def __init__(self, catalog: List[Dict[str, Any]], latency: float = 0.0, jitter: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.catalog = catalog
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._indexed = [
+            (set(f"{t['title']} {t['artist']} {t['album'] or ''}".lower().split()), t)
+            for t in self.catalog
+        ]
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.calls += 1
+            extra = self._random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0
+        return self.latency + extra
+
+    def search(self, query: str, filter: Optional[str] = None, limit: int = 20, **kwargs) -> List[Dict[str, Any]]:
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        words = set(query.lower().split())
+        wanted = {'songs': 'song', 'videos': 'video'}.get(filter)
+        matches = []
+        for position, (track_words, track) in enumerate(self._indexed):
+            if wanted and track['resultType'] != wanted:
+                continue
+            overlap = len(words & track_words)
+            if overlap:
+                matches.append((-overlap, position, track))
+        matches.sort()
+
+        results = [to_search_result(track) for _, _, track in matches[:limit]]
+        if filter is None and results:
+            # Unfiltered searches lead with an artist card, which the searcher must skip
+            top = results[0]['artists'][0]
+            results.insert(0, {"category": "Top result", "resultType": "artist",
+                               "artist": top['name'], "browseId": top['id']})
+        return results
+
+    def get_album(self, browseId: str) -> Dict[str, Any]:
+        """Album page in the shape ytmusicapi's get_album() returns"""
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        tracks = [track for track in self.catalog if track['albumId'] == browseId]
+        if not tracks:
+            raise ValueError(f"Unknown album {browseId}")
+
+        first = to_search_result(tracks[0])
+        return {
+            "title": tracks[0]['album'],
+            "type": "Album",
+            "thumbnails": first['thumbnails'],
+            "artists": first['artists'],
+            "trackCount": len(tracks),
+            "tracks": [
+                {
+                    "videoId": track['videoId'],
+                    "title": track['title'],
+                    "artists": [{"name": track['artist'], "id": track['artistId']}],
+                    "album": track['album'],
+                    "thumbnails": None,
+                    "isAvailable": True,
+                    "duration": format_duration(track['duration']),
+                    "duration_seconds": track['duration'],
+                    "trackNumber": number
+                }
+                for number, track in enumerate(tracks, 1)
+            ]
+        }
+
+
+def build_backend(kind: str, session=None):
+    """Create the backend named by kind; paths and fake latency come from the environment"""
+    if kind == 'replay':
+        return ReplayBackend(os.environ.get('YTMUSIC_RECORDING_PATH', DEFAULT_RECORDING_PATH))
+
+    if kind == 'fake':
+        return FakeBackend(
+            load_tracks(os.environ.get('YTMUSIC_FAKE_CATALOG', DEFAULT_FAKE_CATALOG_PATH)),
+            latency=float(os.environ.get('YTMUSIC_FAKE_LATENCY', 0)),
+            jitter=float(os.environ.get('YTMUSIC_FAKE_JITTER', 0))
+        )
+
+    # Imported here so offline backends and the CLI's usage errors start without it
+    from ytmusicapi import YTMusic
+    live = YTMusic(requests_session=session)
+    if kind == 'record':
+        return RecordingBackend(live, os.environ.get('YTMUSIC_RECORDING_PATH', DEFAULT_RECORDING_PATH))
+    return live
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for YTMusic.search and a synthetic Last.fm now-playing trace
+Both are built from the recorded track catalog in fixtures.json, so benchmarks need no network
+and give the same answers on every run
+"""
+
+import os
+import random
+import sys
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import FakeBackend, load_tracks, to_search_result
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures.json')
+
+
+def load_catalog(path: str = FIXTURES_PATH) -> List[Dict[str, Any]]:
+    return load_tracks(path)
+
+
+class FixtureYTMusic(FakeBackend):
+    """The engine's fake backend, loaded with the fixture catalog by default"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 1,
+                 catalog: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(catalog if catalog is not None else load_catalog(), latency, jitter, seed)
+
+
+def build_trace(users: int = 20, ticks: int = 60, poll_interval: int = 10, seed: int = 1,
+                catalog: Optional[List[Dict[str, Any]]] = None) -> List[List[Dict[str, str]]]:
+    """Now-playing snapshots for each poll tick, as the channel poller would see them
+
+    Every user listens to whole albums in order and is idle a quarter of the time, so
+    the same track is looked up on consecutive ticks and neighbouring tracks follow.
+    """
+    rng = random.Random(seed)
+    catalog = catalog if catalog is not None else load_catalog()
+    albums: Dict[str, List[Dict[str, Any]]] = {}
+    for track in catalog:
+        if track['album']:
+            albums.setdefault(track['album'], []).append(track)
+    album_names = sorted(albums)
+
+    state = []
+    for _ in range(users):
+        album = rng.choice(album_names)
+        state.append({"album": album, "index": 0, "remaining": albums[album][0]['duration']})
+
+    trace = []
+    for _ in range(ticks):
+        snapshot = []
+        for user in state:
+            user['remaining'] -= poll_interval
+            if user['remaining'] <= 0:
+                user['index'] += 1
+                if user['index'] >= len(albums[user['album']]):
+                    user['album'] = rng.choice(album_names)
+                    user['index'] = 0
+                user['remaining'] = albums[user['album']][user['index']]['duration']
+
+            if rng.random() < 0.25:
+                continue
+            track = albums[user['album']][user['index']]
+            snapshot.append({"track": track['title'], "artist": track['artist'], "album": track['album']})
+        trace.append(snapshot)
+    return trace
+
+
+def search_string(entry: Dict[str, str]) -> str:
+    """Same query the Node client (src/youtube.mjs) builds from a now-playing track"""
+    return f"{entry['track']} {entry['artist']} {entry['album']}".strip()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator replaying a Last.fm now-playing trace against the search service
+
+Without --url it starts server.py in-process on a free port with the offline fixture backend
+(simulated upstream latency set by --latency/--jitter), or with --backend replay on responses
+recorded from YouTube Music. --server asgi serves asgi.py with uvicorn instead of the Flask app.
+With --url it targets a running server. Exits with status 1 when any request failed.
+
+    python bench/loadtest.py [--url http://127.0.0.1:8080] [--server asgi] [--concurrency 8] [--users 20] [--ticks 60]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+from urllib.parse import quote, urlparse
+
+os.environ.setdefault('YTMUSIC_STORE_PATH', '')
+os.environ.setdefault('YTMUSIC_CATALOG_PATH', '')
+os.environ.setdefault('YTMUSIC_THUMBNAIL_VERIFY', '0')
+# Measure the search path, not the upstream rate limiter or circuit breaker
+os.environ.setdefault('YTMUSIC_UPSTREAM_QPS', '0')
+os.environ.setdefault('YTMUSIC_BREAKER', '0')
+os.environ.setdefault('YTMUSIC_ALBUM_PREFETCH', '0')
+os.environ.setdefault('YTMUSIC_BACKEND', 'fake')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureYTMusic, build_trace, search_string
+from report import percentile, write_results
+from backends import DEFAULT_RECORDING_PATH, ReplayBackend
+
+
+def start_local_server(threads: int, backend, server_mode: str = 'waitress'):
+    """Serve the Flask or ASGI app on backend in a background thread; returns (base url, searcher)"""
+    import server
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    if server_mode == 'asgi':
+        import asgi
+        import uvicorn
+
+        asgi_server = uvicorn.Server(uvicorn.Config(asgi.app, host='127.0.0.1', port=port, log_level='error'))
+        threading.Thread(target=asgi_server.run, daemon=True).start()
+        # Lifespan startup rebuilds the backend, so swap in the benchmark one only after it
+        while not asgi_server.started:
+            time.sleep(0.01)
+    else:
+        from waitress import create_server
+
+        wsgi_server = create_server(server.app, host='127.0.0.1', port=port, threads=threads)
+        threading.Thread(target=wsgi_server.run, daemon=True).start()
+
+    searcher = server.get_searcher()
+    searcher.ytmusic = backend
+    return f"http://127.0.0.1:{port}", searcher
+
+
+def replay(base_url: str, endpoint: str, trace: List[List[Dict[str, str]]], concurrency: int) -> Dict[str, Any]:
+    """Fire every tick's lookups across `concurrency` keep-alive clients, tick after tick"""
+    target = urlparse(base_url)
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(queries: List[str]):
+        nonlocal errors
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        for query in queries:
+            started = time.perf_counter()
+            try:
+                conn.request('GET', f"/{endpoint}?q={quote(query)}")
+                response = conn.getresponse()
+                body = response.read()
+                ok = response.status == 200 and 'error' not in json.loads(body)
+            except (OSError, http.client.HTTPException, ValueError):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors += 1
+        conn.close()
+
+    started = time.perf_counter()
+    for tick in trace:
+        queries = [search_string(entry) for entry in tick]
+        workers = [
+            threading.Thread(target=client, args=(queries[i::concurrency],))
+            for i in range(min(concurrency, len(queries)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "durationS": round(duration, 3),
+        "throughputRps": round(len(latencies) / duration, 1) if duration else 0.0,
+        "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95Ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a now-playing trace against the search service")
+    parser.add_argument('--url', default='', help="Running server to target (default: start one in-process)")
+    parser.add_argument('--endpoints', default='search,search/detailed')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--ticks', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--server', choices=('waitress', 'asgi'), default='waitress',
+                        help="In-process server: the Flask app on waitress or asgi.py on uvicorn")
+    parser.add_argument('--threads', type=int, default=6, help="Waitress threads for the in-process server")
+    parser.add_argument('--backend', choices=('fake', 'replay'), default='fake',
+                        help="Upstream for the in-process server: the fixture catalog or recorded responses")
+    parser.add_argument('--recording', default=DEFAULT_RECORDING_PATH, help="Recorded responses for --backend replay")
+    parser.add_argument('--latency', type=float, default=0.15, help="Simulated upstream latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Mean extra exponential upstream latency")
+    parser.add_argument('--output', default='', help="Result file (default: bench/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    trace = build_trace(users=args.users, ticks=args.ticks, seed=args.seed)
+    searcher = None
+    base_url = args.url
+    if not base_url:
+        if args.backend == 'replay':
+            backend = ReplayBackend(args.recording)
+        else:
+            backend = FixtureYTMusic(latency=args.latency, jitter=args.jitter)
+        base_url, searcher = start_local_server(args.threads, backend, args.server)
+
+    results = {}
+    for endpoint in args.endpoints.split(','):
+        if searcher is not None:
+            searcher.cache.clear()
+            calls_before = searcher.ytmusic.calls
+        results[endpoint] = replay(base_url, endpoint, trace, args.concurrency)
+        if searcher is not None:
+            results[endpoint]["upstreamCalls"] = searcher.ytmusic.calls - calls_before
+
+        numbers = results[endpoint]
+        print(f"/{endpoint:18} {numbers['requests']:6} req  {numbers['throughputRps']:8.1f} req/s  "
+              f"p50 {numbers['p50Ms']:8.2f} ms  p95 {numbers['p95Ms']:8.2f} ms  p99 {numbers['p99Ms']:8.2f} ms  "
+              f"errors {numbers['errors']}")
+
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    path = write_results("load", results, args.output, config)
+    print(f"Results written to {path}")
+    if any(numbers['errors'] for numbers in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the search pipeline, run against the offline fixture backend
+
+    python bench/microbench.py [--backend fake|replay] [--repeat 5] [--output results/micro.json]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import timeit
+
+# Benchmarks must never touch the developer's persistent result store
+os.environ.setdefault('YTMUSIC_STORE_PATH', '')
+os.environ.setdefault('YTMUSIC_CATALOG_PATH', '')
+os.environ.setdefault('YTMUSIC_THUMBNAIL_VERIFY', '0')
+# Measure the search path, not the upstream rate limiter or circuit breaker
+os.environ.setdefault('YTMUSIC_UPSTREAM_QPS', '0')
+os.environ.setdefault('YTMUSIC_BREAKER', '0')
+os.environ.setdefault('YTMUSIC_ALBUM_PREFETCH', '0')
+os.environ.setdefault('YTMUSIC_BACKEND', 'fake')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import FixtureYTMusic, build_trace, load_catalog, search_string, to_search_result
+from report import write_results
+from backends import DEFAULT_RECORDING_PATH, ReplayBackend
+from engine import YTMusicSearcher
+
+
+def measure(fn, repeat: int, min_time: float = 0.2):
+    """Per-call time in microseconds: best and median over `repeat` timed loops"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {"bestUs": round(min(runs), 3), "medianUs": round(statistics.median(runs), 3), "loops": number}
+
+
+def build_searcher(backend: str, recording: str):
+    if backend == 'replay':
+        return YTMusicSearcher(ReplayBackend(recording))
+    return YTMusicSearcher(FixtureYTMusic())
+
+
+def run(backend: str, recording: str, repeat: int):
+    searcher = build_searcher(backend, recording)
+    catalog = load_catalog()
+    queries = [search_string(entry) for tick in build_trace(users=10, ticks=10) for entry in tick]
+    results = [to_search_result(track) for track in catalog]
+    thumbnails = [result['thumbnails'] for result in results]
+    candidates = searcher.search_with_fallbacks(queries[0])
+    query = queries[0]
+
+    benchmarks = {}
+    benchmarks['normalize_query'] = measure(lambda: [searcher.normalize_query(q) for q in queries[:20]], repeat)
+    benchmarks['extract_best_thumbnail'] = measure(lambda: [searcher.extract_best_thumbnail(t) for t in thumbnails], repeat)
+    benchmarks['score_result_relevance'] = measure(
+        lambda: [searcher.score_result_relevance(r, query) for r in candidates], repeat
+    )
+    if hasattr(searcher, 'score_results'):
+        benchmarks['score_results'] = measure(lambda: searcher.score_results(candidates, query), repeat)
+
+    cache = getattr(searcher, 'cache', None)
+
+    def cold_search():
+        if cache is not None:
+            cache.clear()
+        searcher.search_ytmusic(query)
+
+    benchmarks['search_ytmusic_cold'] = measure(cold_search, repeat)
+    if cache is not None:
+        searcher.search_ytmusic(query)
+        benchmarks['search_ytmusic_warm'] = measure(lambda: searcher.search_ytmusic(query), repeat)
+
+    return benchmarks, {"backend": backend, "repeat": repeat, "queries": len(queries), "candidates": len(candidates)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the YouTube Music search service")
+    parser.add_argument('--backend', choices=('fake', 'replay'), default='fake')
+    parser.add_argument('--recording', default=DEFAULT_RECORDING_PATH, help="Recorded responses for --backend replay")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='', help="Result file (default: bench/results/micro-<backend>-<commit>.json)")
+    args = parser.parse_args()
+
+    benchmarks, config = run(args.backend, args.recording, args.repeat)
+    for name, numbers in benchmarks.items():
+        print(f"{name:28} best {numbers['bestUs']:10.2f} us   median {numbers['medianUs']:10.2f} us")
+
+    path = write_results(f"micro-{args.backend}", benchmarks, args.output, config)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
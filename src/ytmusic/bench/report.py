@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Machine-readable benchmark results
+
+Every benchmark script writes one JSON file holding its measurements plus the commit, Python
+version and host it ran on. Compare two result files with:
+
+    python bench/report.py results/before.json results/after.json
+"""
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile; samples need not be sorted"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5
+        ).stdout.strip() or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+def default_output(kind: str) -> str:
+    return os.path.join(RESULTS_DIR, f"{kind}-{git_commit()}.json")
+
+
+def write_results(kind: str, results: Dict[str, Any], output: str = '', config: Dict[str, Any] = None) -> str:
+    """Write results with run metadata; returns the path written"""
+    path = output or default_output(kind)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    document = {
+        "kind": kind,
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config or {},
+        "results": results
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def flatten(value: Any, prefix: str = '') -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print every numeric metric present in both files with its relative change"""
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+
+    old = flatten(before['results'])
+    new = flatten(after['results'])
+    print(f"{'metric':60} {before['commit']:>12} {after['commit']:>12} {'change':>9}")
+    for metric in sorted(old.keys() & new.keys()):
+        change = f"{(new[metric] - old[metric]) / old[metric] * 100:+.1f}%" if old[metric] else 'n/a'
+        print(f"{metric:60} {old[metric]:12.3f} {new[metric]:12.3f} {change:>9}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python report.py <before.json> <after.json>")
+        sys.exit(1)
+    compare(sys.argv[1], sys.argv[2])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker for upstream YouTube Music calls
+Trips when too many recent calls failed or were slow, then rejects calls outright for a while so
+requests are answered from cache or fail fast instead of holding a thread for a doomed search.
+After the cool-down, single probe calls decide whether to close it again.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from scheduler import AdmissionError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(AdmissionError):
+    pass
+
+
+class CircuitBreaker:
+    """Error-rate and slow-call-rate breaker over a sliding time window of upstream calls"""
+
+    def __init__(self, error_rate: float = 0.5, slow_call: float = 5.0, slow_rate: float = 0.8,
+                 min_calls: int = 10, window: float = 60.0, open_for: float = 30.0, probes: int = 1,
+                 enabled: bool = True):
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        # Consecutive successful probes needed to close; probes run one at a time
+        self.probes = max(1, probes)
+        self.enabled = enabled
+
+        self.state = CLOSED
+        self._calls: deque = deque()  # (finished at, failed, slow)
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._probing = False
+        self._calls.clear()
+        self.opened += 1
+
+    def acquire(self) -> None:
+        """Raise CircuitOpen unless a call may go upstream now"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.open_for:
+                self.state = HALF_OPEN
+                self._probe_successes = 0
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.open_for - now)
+        raise CircuitOpen(f"YouTube Music circuit {self.state}, retrying in {retry_in:.1f}s")
+
+    def release(self) -> None:
+        """Give back a call that was acquired but never made"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        """Outcome of a call made after acquire(); slow successes count against the slow-call rate"""
+        if not self.enabled:
+            return
+        slow = elapsed >= self.slow_call
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if not ok or slow:
+                    self._open(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self.state = CLOSED
+                return
+            if self.state == OPEN:
+                # A call admitted before the breaker tripped
+                return
+
+            self._calls.append((now, not ok, slow))
+            self._trim(now)
+            calls = len(self._calls)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, was_slow in self._calls if was_slow)
+            if failures / calls >= self.error_rate or slow_calls / calls >= self.slow_rate:
+                self._open(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._calls)
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, was_slow in self._calls if was_slow)
+            state = self.state
+            if state == OPEN and time.monotonic() - self._opened_at >= self.open_for:
+                # Nothing has asked since the cool-down ended; the next call is the probe
+                state = HALF_OPEN
+            return {
+                "enabled": self.enabled,
+                "state": state,
+                "recentCalls": calls,
+                "errorRate": round(failures / calls, 3) if calls else 0.0,
+                "slowRate": round(slow_calls / calls, 3) if calls else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
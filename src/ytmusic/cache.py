@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+In-process result cache for the YouTube Music search service
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache with separate TTLs for positive and negative results"""
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 3600, negative_ttl: float = 300):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, negative = entry
+            if expires_at <= time.monotonic():
+                # Expired entries stay until evicted so get_stale() can still serve them
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if negative:
+                self.negative_hits += 1
+            return value
+
+    def get_stale(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return the value for key even if it has expired (by at most max_age seconds, when given);
+        does not count as a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if max_age is not None and entry[1] + max_age <= time.monotonic():
+                return None
+            return entry[0]
+
+    def __contains__(self, key: str) -> bool:
+        """Whether key has a fresh entry; does not count as a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def set(self, key: str, value: Any, negative: bool = False) -> None:
+        """Store value under key, evicting the least recently used entries when full"""
+        if self.maxsize == 0:
+            return
+
+        ttl = self.negative_ttl if negative else self.ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl, negative)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def sample(self, count: int) -> List[Any]:
+        """Values of up to count most recently used entries, fresh or expired; not a lookup"""
+        with self._lock:
+            return [entry[0] for entry in itertools.islice(reversed(self._entries.values()), count)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters exposed on the health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.maxsize,
+                "ttl": self.ttl,
+                "negativeTtl": self.negative_ttl,
+                "hits": self.hits,
+                "negativeHits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hitRatio": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local track catalog for the YouTube Music search service
+An inverted index (title/artist/album tokens -> tracks) built from upstream search results.
+Candidates are ranked by IDF-weighted token overlap and then scored with the same weights as
+YTMusicSearcher.score_result_relevance. That score is not a confidence (a short title inside the
+query alone earns most of it), so a local match must also account for the whole query: its title
+and artist appear in it and whatever is left names its album. Such a match saves the upstream search.
+
+Tracks are appended to an NDJSON file, one compact record per line. On startup the file is
+memory-mapped and only byte offsets are kept, records are decoded when they are scored. Pre-fork
+workers append to the same file, so duplicates found on startup are compacted away.
+"""
+
+import fcntl
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Union
+
+from scoring import QueryTokens, score_tokens, tokens_for_result
+from thumbnails import best_thumbnail
+
+logger = logging.getLogger(__name__)
+
+
+def compact_record(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The fields of an upstream result that resolve_query reads, with only the largest thumbnail"""
+    video_id = result.get('videoId')
+    if not video_id:
+        return None
+
+    best = best_thumbnail(result.get('thumbnails') or [])
+    album = result.get('album')
+    return {
+        "videoId": video_id,
+        "title": result.get('title', '') or '',
+        "artists": [{"name": artist.get('name', '')} for artist in result.get('artists') or []],
+        "album": {"name": album.get('name', '')} if isinstance(album, dict) else None,
+        "duration_seconds": result.get('duration_seconds'),
+        "thumbnails": [best] if best else [],
+        "resultType": result.get('resultType', 'song')
+    }
+
+
+def match_words(text: str) -> FrozenSet[str]:
+    """Words without punctuation, so "Help!" in a record matches "Help" in a sanitized query"""
+    return frozenset(re.findall(r'\w+', text.lower()))
+
+
+def covers_query(query_words: FrozenSet[str], record: Dict[str, Any]) -> bool:
+    """Whether record explains the whole "<title> <artist> <album>" query, album included"""
+    title = match_words(record.get('title', ''))
+    artists = [match_words(artist.get('name', '')) for artist in record.get('artists') or []]
+    if not title or not title <= query_words or not any(words and words <= query_words for words in artists):
+        return False
+
+    rest = query_words - title - frozenset().union(*artists)
+    if not rest:
+        return True
+    album = record.get('album') or {}
+    return rest <= match_words(album.get('name', '') or '')
+
+
+def record_words(record: Dict[str, Any]) -> FrozenSet[str]:
+    """Index terms of a record, tokenized the way the relevance score tokenizes candidates"""
+    album = record.get('album') or {}
+    text = ' '.join([record.get('title', '')] + [artist.get('name', '') for artist in record.get('artists') or []]
+                    + [album.get('name', '')])
+    return frozenset(text.lower().split())
+
+
+class CatalogIndex:
+    """Append-only, memory-mapped track catalog with an in-memory inverted index"""
+
+    def __init__(self, path: str, threshold: float = 0.85, max_entries: int = 100000,
+                 candidates: int = 50, limit: int = 5):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.candidates = candidates
+        self.limit = limit
+
+        # Each document is a byte offset into the mapped file or, once added at runtime, the record itself
+        self._docs: List[Union[int, Dict[str, Any]]] = []
+        self._by_video: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.added = 0
+
+        # Appends hold it shared and loading holds it exclusively, so a compaction never drops lines
+        # other workers append between its scan and its rename
+        self._file_lock = open(f"{path}.lock", 'ab')
+        self._load()
+
+    def _load(self) -> None:
+        """Map and index the catalog file, compacting it first when it holds duplicate tracks"""
+        # Workers starting together load one at a time, so only the first one compacts
+        fcntl.flock(self._file_lock, fcntl.LOCK_EX)
+        try:
+            if self._scan():
+                self._compact()
+                self._docs, self._by_video, self._postings = [], {}, {}
+                self._scan()
+            self._file = open(self.path, 'ab')
+        finally:
+            fcntl.flock(self._file_lock, fcntl.LOCK_UN)
+
+    def _scan(self) -> int:
+        """Map the catalog file and index every complete line; returns how many lines were duplicates"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return 0
+
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        duplicates = 0
+        offset = 0
+        size = len(self._map)
+        while offset < size:
+            end = self._map.find(b'\n', offset)
+            if end < 0:
+                # Torn last write; the next append starts on a fresh line
+                with open(self.path, 'ab') as f:
+                    f.write(b'\n')
+                break
+            try:
+                if not self._index(offset, json.loads(self._map[offset:end])):
+                    duplicates += 1
+            except ValueError:
+                logger.error(f"Skipping unreadable catalog record at byte {offset}")
+            offset = end + 1
+
+        logger.info(f"Loaded {len(self._by_video)} catalog tracks from {self.path}")
+        return duplicates
+
+    def _compact(self) -> None:
+        """Rewrite the file with one line per indexed track"""
+        temporary = f"{self.path}.compact"
+        try:
+            with open(temporary, 'wb') as f:
+                for doc in self._docs:
+                    f.write(self._map[doc:self._map.find(b'\n', doc) + 1])
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.error(f"Catalog compaction failed: {e}")
+            return
+        logger.info(f"Compacted {self.path} to {len(self._docs)} tracks")
+
+    def _reopen(self) -> None:
+        """Follow a compaction done by a worker that started later; appends to the old file would be lost"""
+        try:
+            if os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino:
+                return
+        except OSError:
+            pass
+        self._file.close()
+        self._file = open(self.path, 'ab')
+
+    def _index(self, doc: Union[int, Dict[str, Any]], record: Dict[str, Any]) -> bool:
+        """Index a record; False when it has no videoId or its track is already indexed"""
+        video_id = record.get('videoId')
+        if not video_id or video_id in self._by_video:
+            return False
+
+        doc_id = len(self._docs)
+        self._docs.append(doc)
+        self._by_video[video_id] = doc_id
+
+        for word in record_words(record):
+            self._postings.setdefault(word, []).append(doc_id)
+        return True
+
+    def _record(self, doc_id: int) -> Dict[str, Any]:
+        doc = self._docs[doc_id]
+        if isinstance(doc, dict):
+            return doc
+        end = self._map.find(b'\n', doc)
+        return json.loads(self._map[doc:end])
+
+    def add(self, results: List[Dict[str, Any]]) -> int:
+        """Index new upstream results and append them to the catalog file; returns how many were new"""
+        lines = []
+        with self._lock:
+            for result in results:
+                if len(self._by_video) >= self.max_entries:
+                    break
+                record = compact_record(result)
+                if record is None or record["videoId"] in self._by_video:
+                    continue
+                self._index(record, record)
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+
+            if lines:
+                try:
+                    fcntl.flock(self._file_lock, fcntl.LOCK_SH)
+                    try:
+                        self._reopen()
+                        self._file.write(b''.join(lines))
+                        self._file.flush()
+                    finally:
+                        fcntl.flock(self._file_lock, fcntl.LOCK_UN)
+                except OSError as e:
+                    logger.error(f"Catalog write failed: {e}")
+                self.added += len(lines)
+
+        return len(lines)
+
+    def lookup(self, query: str) -> List[Dict[str, Any]]:
+        """Best local matches for query, or [] when none reaches the confidence threshold"""
+        tokens = QueryTokens(query)
+        with self._lock:
+            self.lookups += 1
+            total = len(self._docs)
+            weights: Dict[int, float] = {}
+            for word in tokens.words:
+                postings = self._postings.get(word)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for doc_id in postings:
+                    weights[doc_id] = weights.get(doc_id, 0.0) + idf
+
+            top = heapq.nlargest(self.candidates, weights, key=weights.__getitem__)
+            records = [self._record(doc_id) for doc_id in top]
+
+        query_words = match_words(query)
+        scored = [
+            (score_tokens(tokens, tokens_for_result(record), bool(record.get('duration_seconds'))), record)
+            for record in records
+            if covers_query(query_words, record)
+        ]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        if not scored or scored[0][0] < self.threshold:
+            return []
+
+        self.hits += 1
+        return [record for _, record in scored[:self.limit]]
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+            self._file_lock.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "size": len(self._docs),
+            "maxEntries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hitRatio": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "added": self.added
+        }
@@ -0,0 +1,767 @@
+#!/usr/bin/env python3
+"""
+YouTube Music search engine shared by the HTTP server (server.py, asgi.py) and the CLI (api.py)
+Caching, request coalescing, admission control, strategy execution and scoring live here once;
+the upstream is a pluggable backend (see backends.py).
+"""
+
+import atexit
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from albums import AlbumIndex
+from backends import BACKENDS, LIVE_BACKENDS, build_backend
+from breaker import CircuitBreaker
+from cache import TTLCache
+from catalog import CatalogIndex
+from latency import LatencyWindow
+from metrics import Metrics
+from records import TrackRecord, deep_sizeof, score_records
+from refresh import BackgroundRefresher
+from scheduler import Admission, AdmissionError, UpstreamScheduler, INTERACTIVE, BACKGROUND
+from scoring import score_results
+from singleflight import SingleFlight
+from store import ResultStore
+from strategies import SEARCH_STRATEGIES, STRATEGY_ORDERS, StrategyPlanner, query_pattern, strategy_label
+from thumbnails import HttpFetcher, ThumbnailResolver, best_thumbnail, upgrade_url
+from transport import build_session
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_MODES = ('sequential', 'parallel', 'hedged')
+
+SCORING_MODES = ('compiled', 'legacy')
+
+metrics = Metrics(enabled=os.environ.get('YTMUSIC_METRICS', '1') != '0')
+metrics.declare('counter', 'ytmusic_requests_total', 'HTTP requests handled, by endpoint')
+metrics.declare('gauge', 'ytmusic_requests_in_flight', 'HTTP requests currently being handled, by endpoint')
+metrics.declare('histogram', 'ytmusic_request_seconds', 'End-to-end HTTP request latency, by endpoint')
+metrics.declare('histogram', 'ytmusic_stage_seconds', 'Latency of in-process search stages, by stage')
+metrics.declare('counter', 'ytmusic_upstream_calls_total', 'YouTube Music search calls, by strategy')
+metrics.declare('counter', 'ytmusic_upstream_errors_total', 'Failed YouTube Music search calls, by strategy')
+metrics.declare('gauge', 'ytmusic_upstream_in_flight', 'YouTube Music search calls currently in flight')
+metrics.declare('histogram', 'ytmusic_upstream_seconds', 'YouTube Music search call latency, by strategy')
+metrics.declare('counter', 'ytmusic_strategy_wins_total', 'Upstream resolutions answered by each strategy (none = no results, failed = upstream errors)')
+metrics.declare('counter', 'ytmusic_admission_total', 'Upstream admission outcomes: admitted, rejected, expired, stale')
+metrics.declare('counter', 'ytmusic_album_prefetch_total', 'Album prefetches by outcome: scheduled, pending, dropped, fetched, throttled')
+metrics.declare('counter', 'ytmusic_refresh_total', 'Stale-while-revalidate and pre-warm refreshes by outcome')
+metrics.declare('counter', 'ytmusic_errors_total', 'Errors returned to callers, by where they were raised')
+
+class UpstreamError(Exception):
+    """Every strategy that could have answered a query failed, so its miss is not a real "no results\""""
+    pass
+
+class YTMusicSearcher:
+    def __init__(self, backend=None):
+        self.session = None
+        # The search backend: YTMusic itself, or any object with the same search() signature
+        self.ytmusic = backend
+        self.backend_kind = os.environ.get('YTMUSIC_BACKEND', 'live').lower()
+        if self.backend_kind not in BACKENDS:
+            logger.error(f"Unknown YTMUSIC_BACKEND '{self.backend_kind}', using live")
+            self.backend_kind = 'live'
+        if backend is None:
+            default_pool_size = int(os.environ.get('SERVER_THREADS', 6)) + int(os.environ.get('YTMUSIC_STRATEGY_WORKERS', 12))
+            self.build_upstream(int(os.environ.get('YTMUSIC_POOL_SIZE', default_pool_size)))
+        
+        self.cache = TTLCache(
+            maxsize=int(os.environ.get('YTMUSIC_CACHE_SIZE', 2048)),
+            ttl=float(os.environ.get('YTMUSIC_CACHE_TTL', 3600)),
+            negative_ttl=float(os.environ.get('YTMUSIC_CACHE_NEGATIVE_TTL', 300))
+        )
+        self.store = self.open_store()
+        self.catalog = self.open_catalog()
+        self.inflight = SingleFlight()
+        
+        self.strategy_mode = os.environ.get('YTMUSIC_STRATEGY_MODE', 'sequential').lower()
+        if self.strategy_mode not in STRATEGY_MODES:
+            logger.error(f"Unknown YTMUSIC_STRATEGY_MODE '{self.strategy_mode}', using sequential")
+            self.strategy_mode = 'sequential'
+        self.hedge_percentile = float(os.environ.get('YTMUSIC_HEDGE_PERCENTILE', 90))
+        self.hedge_default_delay = float(os.environ.get('YTMUSIC_HEDGE_DELAY', 1.0))
+        self.upstream_latency = LatencyWindow()
+        
+        strategy_order = os.environ.get('YTMUSIC_STRATEGY_ORDER', 'adaptive').lower()
+        if strategy_order not in STRATEGY_ORDERS:
+            logger.error(f"Unknown YTMUSIC_STRATEGY_ORDER '{strategy_order}', using adaptive")
+            strategy_order = 'adaptive'
+        self.planner = StrategyPlanner(
+            SEARCH_STRATEGIES,
+            adaptive=strategy_order == 'adaptive',
+            min_samples=int(os.environ.get('YTMUSIC_STRATEGY_MIN_SAMPLES', 20)),
+            skip_below=float(os.environ.get('YTMUSIC_STRATEGY_SKIP_BELOW', 0.02))
+        )
+        
+        self.scheduler = UpstreamScheduler(
+            rate=float(os.environ.get('YTMUSIC_UPSTREAM_QPS', 10)),
+            burst=float(os.environ.get('YTMUSIC_UPSTREAM_BURST', 20)),
+            max_queue=int(os.environ.get('YTMUSIC_UPSTREAM_QUEUE', 100))
+        )
+        # Callers give up after 15 s (src/youtube.mjs); leave time to send the answer back
+        self.request_budget = float(os.environ.get('YTMUSIC_REQUEST_DEADLINE', 14))
+        # A request that can be answered from an expired entry barely waits for upstream slots
+        self.stale_queue_wait = float(os.environ.get('YTMUSIC_STALE_QUEUE_WAIT', 0.5))
+        self.breaker = CircuitBreaker(
+            error_rate=float(os.environ.get('YTMUSIC_BREAKER_ERROR_RATE', 0.5)),
+            slow_call=float(os.environ.get('YTMUSIC_BREAKER_SLOW_CALL', 5.0)),
+            slow_rate=float(os.environ.get('YTMUSIC_BREAKER_SLOW_RATE', 0.8)),
+            min_calls=int(os.environ.get('YTMUSIC_BREAKER_MIN_CALLS', 10)),
+            window=float(os.environ.get('YTMUSIC_BREAKER_WINDOW', 60)),
+            open_for=float(os.environ.get('YTMUSIC_BREAKER_OPEN_SECONDS', 30)),
+            enabled=os.environ.get('YTMUSIC_BREAKER', '1') != '0'
+        )
+        
+        # Background refreshes draw from their own upstream budget, never from the live one
+        refresh_workers = int(os.environ.get('YTMUSIC_REFRESH_WORKERS', 2))
+        self.refresh_scheduler = UpstreamScheduler(
+            rate=float(os.environ.get('YTMUSIC_REFRESH_QPS', 2)),
+            burst=float(os.environ.get('YTMUSIC_REFRESH_BURST', 5)),
+            max_queue=refresh_workers
+        )
+        self.refresher = BackgroundRefresher(
+            self.refresh_query,
+            workers=refresh_workers,
+            max_pending=int(os.environ.get('YTMUSIC_REFRESH_QUEUE', 500))
+        )
+        self.stale_ttl = float(os.environ.get('YTMUSIC_CACHE_STALE_TTL', 86400))
+        
+        self.albums = None
+        if os.environ.get('YTMUSIC_ALBUM_PREFETCH', '1') != '0':
+            self.albums = AlbumIndex(
+                self.normalize_query,
+                maxsize=int(os.environ.get('YTMUSIC_ALBUM_CACHE_SIZE', 2000)),
+                ttl=float(os.environ.get('YTMUSIC_ALBUM_TTL', 86400))
+            )
+        self.album_threshold = float(os.environ.get('YTMUSIC_ALBUM_THRESHOLD', 0.85))
+        # Album fetches share the background upstream budget with refreshes
+        self.album_fetcher = BackgroundRefresher(self.prefetch_album, workers=1, max_pending=100)
+        
+        thumbnail_workers = int(os.environ.get('YTMUSIC_THUMBNAIL_WORKERS', 2))
+        verify_thumbnails = os.environ.get('YTMUSIC_THUMBNAIL_VERIFY', '1') != '0'
+        self.thumbnails = ThumbnailResolver(
+            fetcher=HttpFetcher(build_session(thumbnail_workers)) if verify_thumbnails else None,
+            maxsize=int(os.environ.get('YTMUSIC_THUMBNAIL_CACHE_SIZE', 8192)),
+            ttl=float(os.environ.get('YTMUSIC_THUMBNAIL_TTL', 86400)),
+            workers=thumbnail_workers
+        )
+        
+        self.scoring_mode = os.environ.get('YTMUSIC_SCORING', 'compiled').lower()
+        if self.scoring_mode not in SCORING_MODES:
+            logger.error(f"Unknown YTMUSIC_SCORING '{self.scoring_mode}', using compiled")
+            self.scoring_mode = 'compiled'
+        self.strategy_executor = None
+        if self.strategy_mode != 'sequential':
+            self.strategy_executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get('YTMUSIC_STRATEGY_WORKERS', 12)),
+                thread_name_prefix='ytmusic-strategy'
+            )
+    
+    def build_upstream(self, pool_size: int) -> None:
+        """(Re)create the backend; live ones get a pooled session holding pool_size connections"""
+        try:
+            session = build_session(pool_size) if self.backend_kind in LIVE_BACKENDS else None
+            self.ytmusic = build_backend(self.backend_kind, session)
+            self.session = session
+            logger.info(f"YTMusic {self.backend_kind} backend initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize YTMusic {self.backend_kind} backend: {e}")
+    
+    def open_store(self) -> Optional[ResultStore]:
+        """Open the persistent result store; an empty YTMUSIC_STORE_PATH disables it"""
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ytmusic_cache.db')
+        path = os.environ.get('YTMUSIC_STORE_PATH', default_path)
+        if not path:
+            return None
+        
+        try:
+            store = ResultStore(
+                path,
+                max_entries=int(os.environ.get('YTMUSIC_STORE_MAX_ENTRIES', 50000)),
+                ttl=float(os.environ.get('YTMUSIC_STORE_TTL', 604800))
+            )
+            atexit.register(store.close)
+            return store
+        except Exception as e:
+            logger.error(f"Failed to open result store at {path}: {e}")
+            return None
+    
+    def open_catalog(self) -> Optional[CatalogIndex]:
+        """Open the local track catalog; an empty YTMUSIC_CATALOG_PATH disables it"""
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ytmusic_catalog.ndjson')
+        path = os.environ.get('YTMUSIC_CATALOG_PATH', default_path)
+        if not path:
+            return None
+        
+        try:
+            catalog = CatalogIndex(
+                path,
+                threshold=float(os.environ.get('YTMUSIC_CATALOG_THRESHOLD', 0.85)),
+                max_entries=int(os.environ.get('YTMUSIC_CATALOG_MAX_ENTRIES', 100000))
+            )
+            atexit.register(catalog.close)
+            return catalog
+        except Exception as e:
+            logger.error(f"Failed to open track catalog at {path}: {e}")
+            return None
+    
+    def normalize_query(self, query: str) -> str:
+        """Normalize search query for better matching while preserving Unicode"""
+        query = re.sub(r'[^\w\s\-\u00C0-\u017F\u0400-\u04FF\u0600-\u06FF\u4E00-\u9FFF\u3040-\u309F\u30A0-\u30FF\uAC00-\uD7AF]', ' ', query, flags=re.UNICODE)
+        query = re.sub(r'\s+', ' ', query).strip()
+        return query
+    
+    def cache_key(self, query: str) -> str:
+        """Cache key for a query: the normalized, case-folded search string"""
+        return self.normalize_query(query).lower()
+    
+    def extract_best_thumbnail(self, thumbnails: List[Dict]) -> Optional[str]:
+        """Extract the best quality thumbnail URL, unverified"""
+        best = best_thumbnail(thumbnails)
+        if best is None:
+            return None
+        return upgrade_url(best.get('url', ''))
+    
+    def admission(self, priority: str = INTERACTIVE) -> Admission:
+        """Priority and deadline for the upstream calls made on behalf of one request"""
+        return Admission.create(priority, self.request_budget)
+    
+    def admit(self, admission: Admission) -> None:
+        """Check the circuit breaker and wait for the upstream rate limiter; raises AdmissionError
+        when the call must not be made"""
+        try:
+            self.breaker.acquire()
+            try:
+                (admission.scheduler or self.scheduler).acquire(admission)
+            except AdmissionError:
+                self.breaker.release()
+                raise
+        except AdmissionError as e:
+            metrics.inc('ytmusic_admission_total', outcome=type(e).__name__)
+            raise
+        metrics.inc('ytmusic_admission_total', outcome='admitted')
+    
+    def run_strategy(self, search_query: str, strategy: Dict[str, Any],
+                     admission: Admission, pattern: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Run a single upstream search strategy and keep only playable music results; None when the call failed"""
+        self.admit(admission)
+        label = strategy_label(strategy)
+        metrics.inc('ytmusic_upstream_calls_total', strategy=label)
+        metrics.inc('ytmusic_upstream_in_flight')
+        started = time.monotonic()
+        ok = False
+        try:
+            results = self.ytmusic.search(
+                search_query, 
+                filter=strategy.get('filter'), 
+                limit=strategy.get('limit', 5)
+            )
+            ok = True
+        except Exception as e:
+            metrics.inc('ytmusic_upstream_errors_total', strategy=label)
+            logger.error(f"Search strategy {strategy} failed: {e}")
+            return None
+        finally:
+            elapsed = time.monotonic() - started
+            self.upstream_latency.observe(elapsed)
+            self.breaker.record(ok, elapsed)
+            metrics.inc('ytmusic_upstream_in_flight', -1)
+            metrics.observe('ytmusic_upstream_seconds', elapsed, strategy=label)
+        
+        music_results = [
+            r for r in results or []
+            if r.get('videoId') and r.get('title') and 
+            not r.get('resultType') in ['playlist', 'channel', 'podcast']
+        ]
+        if pattern is not None:
+            self.planner.record(pattern, strategy, bool(music_results))
+        return music_results
+    
+    def search_with_fallbacks(self, query: str, admission: Optional[Admission] = None) -> List[Dict[str, Any]]:
+        """Answer from a prefetched album or the local catalog when it is confident, otherwise search upstream"""
+        if self.albums:
+            track = self.albums.lookup(query)
+            if track is not None:
+                metrics.inc('ytmusic_strategy_wins_total', strategy='album')
+                return [track]
+        
+        if self.catalog:
+            with metrics.timer('ytmusic_stage_seconds', stage='catalog'):
+                local_results = self.catalog.lookup(query)
+            if local_results:
+                metrics.inc('ytmusic_strategy_wins_total', strategy='catalog')
+                return local_results
+        
+        results = self.search_strategies(query, admission or self.admission())
+        if self.catalog and results:
+            self.catalog.add(results)
+        return results
+    
+    def search_strategies(self, query: str, admission: Admission) -> List[Dict[str, Any]]:
+        """Search with multiple strategies for better accuracy"""
+        with metrics.timer('ytmusic_stage_seconds', stage='normalize'):
+            search_query = self.normalize_query(query)
+        
+        pattern = query_pattern(search_query)
+        strategies = self.planner.plan(pattern)
+        if self.strategy_mode == 'parallel':
+            return self.search_parallel(search_query, strategies, admission, pattern)
+        if self.strategy_mode == 'hedged':
+            return self.search_hedged(search_query, strategies, admission, pattern)
+        
+        outcomes = []
+        for strategy in strategies:
+            music_results = self.run_strategy(search_query, strategy, admission, pattern)
+            if music_results:
+                metrics.inc('ytmusic_strategy_wins_total', strategy=strategy_label(strategy))
+                return music_results
+            outcomes.append(music_results)
+        
+        return self.no_results(outcomes)
+    
+    def no_results(self, outcomes: List[Optional[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """[] when every strategy came back empty; raises UpstreamError when any of them failed instead,
+        so an outage is not cached as a miss"""
+        if any(outcome is None for outcome in outcomes):
+            metrics.inc('ytmusic_strategy_wins_total', strategy='failed')
+            raise UpstreamError("YouTube Music search failed")
+        metrics.inc('ytmusic_strategy_wins_total', strategy='none')
+        return []
+    
+    def search_parallel(self, search_query: str, strategies: List[Dict[str, Any]],
+                        admission: Admission, pattern: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Launch every strategy at once and return the first non-empty result in priority order"""
+        futures = [
+            self.strategy_executor.submit(self.run_strategy, search_query, strategy, admission, pattern)
+            for strategy in strategies
+        ]
+        try:
+            outcomes = []
+            for strategy, future in zip(strategies, futures):
+                music_results = future.result()
+                if music_results:
+                    metrics.inc('ytmusic_strategy_wins_total', strategy=strategy_label(strategy))
+                    return music_results
+                outcomes.append(music_results)
+            return self.no_results(outcomes)
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def hedge_delay(self) -> float:
+        """Seconds to wait on a strategy before speculatively starting the next one"""
+        if len(self.upstream_latency) < 20:
+            return self.hedge_default_delay
+        return self.upstream_latency.percentile(self.hedge_percentile)
+    
+    def search_hedged(self, search_query: str, strategies: List[Dict[str, Any]],
+                      admission: Admission, pattern: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run strategies in priority order, starting the next one early when the current one is slow"""
+        futures = []
+        
+        def launch_next():
+            strategy = strategies[len(futures)]
+            futures.append(self.strategy_executor.submit(self.run_strategy, search_query, strategy, admission, pattern))
+        
+        launch_next()
+        try:
+            outcomes = []
+            for index in range(len(strategies)):
+                if index == len(futures):
+                    launch_next()
+                future = futures[index]
+                while len(futures) < len(strategies):
+                    try:
+                        future.result(timeout=self.hedge_delay())
+                        break
+                    except FutureTimeoutError:
+                        launch_next()
+                
+                music_results = future.result()
+                if music_results:
+                    metrics.inc('ytmusic_strategy_wins_total', strategy=strategy_label(strategies[index]))
+                    return music_results
+                outcomes.append(music_results)
+            return self.no_results(outcomes)
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def score_result_relevance(self, result: Dict, original_query: str) -> float:
+        """Enhanced scoring for track + artist + album queries"""
+        score = 0.0
+        query_lower = original_query.lower()
+        query_words = set(query_lower.split())
+        
+        title = result.get('title', '').lower()
+        if title:
+            if query_lower in title or title in query_lower:
+                score += 0.6
+            
+            title_words = set(title.split())
+            word_overlap = len(query_words.intersection(title_words))
+            if query_words:
+                score += (word_overlap / len(query_words)) * 0.4
+        
+        artists = result.get('artists', [])
+        if artists:
+            artist_names = ' '.join([artist.get('name', '') for artist in artists]).lower()
+            if artist_names:
+                artist_words = set(artist_names.split())
+                artist_overlap = len(query_words.intersection(artist_words))
+                if query_words:
+                    score += (artist_overlap / len(query_words)) * 0.3
+                
+                for artist in artists:
+                    artist_name = artist.get('name', '').lower()
+                    if artist_name and artist_name in query_lower:
+                        score += 0.2
+        
+        album_info = result.get('album')
+        if album_info and isinstance(album_info, dict):
+            album_name = album_info.get('name', '').lower()
+            if album_name:
+                album_words = set(album_name.split())
+                album_overlap = len(query_words.intersection(album_words))
+                if query_words:
+                    score += (album_overlap / len(query_words)) * 0.15
+        
+        if len(title) > 100:
+            score *= 0.9
+        
+        if result.get('duration_seconds'):
+            score += 0.05
+            
+        return min(score, 1.0)
+    
+    def score_results(self, results: List[Dict], original_query: str) -> List[float]:
+        """Score all candidates of a request; YTMUSIC_SCORING=legacy scores them one by one"""
+        if self.scoring_mode == 'legacy':
+            return [self.score_result_relevance(result, original_query) for result in results]
+        return score_results(results, original_query)
+    
+    def search_ytmusic(self, query: str, priority: str = INTERACTIVE) -> Dict[str, Any]:
+        """Enhanced search function with better accuracy and cover art"""
+        try:
+            if not self.ytmusic:
+                return {"error": "YTMusic API not initialized"}
+            
+            if not query or len(query.strip()) < 2:
+                return {"error": "Query too short"}
+            
+            key = self.cache_key(query)
+            cached = self.cached_result(key, query)
+            if cached is not None:
+                return cached
+            
+            return self.search_upstream(key, query, self.admission(priority))
+            
+        except Exception as e:
+            metrics.inc('ytmusic_errors_total', where='search_ytmusic')
+            logger.error(f"Search error: {e}")
+            return {"error": f"Search failed: {str(e)}"}
+    
+    def memory_stats(self, sample: int = 200) -> Dict[str, Any]:
+        """Heap held by the result cache, measured on the most recently used entries"""
+        entries = self.cache.sample(sample)
+        # Strings shared between entries (interned names, common keys) are counted once
+        seen = set()
+        sampled = sum(deep_sizeof(entry, seen) for entry in entries)
+        per_entry = sampled / len(entries) if entries else 0.0
+        return {
+            "cacheEntries": len(self.cache),
+            "sampledEntries": len(entries),
+            "bytesPerEntry": round(per_entry),
+            "estimatedBytes": round(per_entry * len(self.cache)),
+            "estimatedBytesAtMaxSize": round(per_entry * self.cache.maxsize)
+        }
+    
+    def cached_result(self, key: str, query: str) -> Optional[Dict[str, Any]]:
+        """Look a query up in the in-memory cache, then the persistent store"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self.result_for_query(cached, query)
+        
+        stored = self.stored_result(key)
+        if stored is not None:
+            return self.result_for_query(stored, query)
+        
+        if self.stale_ttl > 0:
+            stale = self.cache.get_stale(key, self.stale_ttl)
+            if stale is not None and stale.get("results"):
+                metrics.inc('ytmusic_refresh_total', outcome=f"stale_{self.refresher.schedule(key, query)}")
+                return self.result_for_query(stale, query)
+        
+        return None
+    
+    def stored_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Fresh result from the persistent store, copied into the in-memory cache"""
+        if not self.store:
+            return None
+        stored = self.store.get(key)
+        if stored is not None:
+            self.cache.set(key, compact_payload(stored))
+        return stored
+    
+    def refresh_query(self, key: str, query: str) -> bool:
+        """Re-resolve a query on the background budget; False when the budget turned it away"""
+        admission = Admission.create(BACKGROUND, float(os.environ.get('YTMUSIC_REFRESH_DEADLINE', 60)),
+                                     self.refresh_scheduler)
+        try:
+            result, _ = self.inflight.do(key, lambda: self.resolve_and_cache(key, query, admission))
+        except AdmissionError:
+            metrics.inc('ytmusic_refresh_total', outcome='throttled')
+            return False
+        
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        metrics.inc('ytmusic_refresh_total', outcome='refreshed')
+        return True
+    
+    def warm(self, queries: List[str]) -> Dict[str, int]:
+        """Queue background resolution of queries that have no fresh cache entry"""
+        counts = {"scheduled": 0, "pending": 0, "dropped": 0, "cached": 0}
+        for query in queries:
+            key = self.cache_key(query)
+            if key in self.cache or self.stored_result(key) is not None:
+                counts["cached"] += 1
+                continue
+            outcome = self.refresher.schedule(key, query)
+            counts[outcome] += 1
+            metrics.inc('ytmusic_refresh_total', outcome=f"warm_{outcome}")
+        return counts
+    
+    def search_upstream(self, key: str, query: str, admission: Admission) -> Dict[str, Any]:
+        """Resolve a cache miss, sharing the upstream search with concurrent identical queries"""
+        admission = self.fallback_admission(key, admission)
+        try:
+            result, _ = self.inflight.do(key, lambda: self.resolve_and_cache(key, query, admission))
+            return self.result_for_query(result, query)
+        except AdmissionError as e:
+            return self.stale_or_busy(key, query, e)
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            return {"error": f"Search failed: {str(e)}"}
+    
+    def fallback_admission(self, key: str, admission: Admission) -> Admission:
+        """Cap the queue wait at YTMUSIC_STALE_QUEUE_WAIT when an expired answer exists, so an empty
+        token bucket is answered stale right away instead of at the request deadline"""
+        scheduler = admission.scheduler or self.scheduler
+        if not scheduler.enabled or admission.max_wait is not None or self.stale_entry(key) is None:
+            return admission
+        return admission._replace(max_wait=self.stale_queue_wait)
+    
+    def stale_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Expired cache or store entry for key, if any"""
+        stale = self.cache.get_stale(key)
+        if stale is None and self.store:
+            stale = self.store.get(key, allow_expired=True)
+        return stale
+    
+    def stale_or_busy(self, key: str, query: str, reason: AdmissionError) -> Dict[str, Any]:
+        """Answer from an expired cache or store entry when the upstream budget is exhausted"""
+        stale = self.stale_entry(key)
+        if stale is None:
+            return {"error": f"Upstream busy: {reason}"}
+        
+        metrics.inc('ytmusic_admission_total', outcome='stale')
+        result = self.result_for_query(stale, query)
+        result["stale"] = True
+        return result
+    
+    def search_batch(self, queries: List[Any], concurrency: int,
+                     priority: str = BACKGROUND) -> List[Dict[str, Any]]:
+        """Resolve many queries at once; results in input order"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        for index, result in self.iter_batch(queries, concurrency, priority):
+            results[index] = result
+        return results
+    
+    def iter_batch(self, queries: List[Any], concurrency: int,
+                   priority: str = BACKGROUND) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Dedupe, answer from cache, search the rest concurrently; yields (index, result) as each is ready"""
+        ready: List[Tuple[int, Dict[str, Any]]] = []
+        pending: Dict[str, List[int]] = {}
+        
+        for index, query in enumerate(queries):
+            if not isinstance(query, str):
+                ready.append((index, {"error": "Query must be a string"}))
+                continue
+            
+            query = query.strip()
+            if not self.ytmusic or len(query) < 2:
+                ready.append((index, self.search_ytmusic(query, priority)))
+                continue
+            
+            key = self.cache_key(query)
+            if key in pending:
+                pending[key].append(index)
+                continue
+            
+            cached = self.cached_result(key, query)
+            if cached is not None:
+                ready.append((index, cached))
+            else:
+                pending[key] = [index]
+        
+        if not pending:
+            yield from ready
+            return
+        
+        admission = self.admission(priority)
+        workers = max(1, min(concurrency, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ytmusic-batch') as executor:
+            # Upstream searches start before the ready answers are handed out
+            futures = {
+                executor.submit(self.search_upstream, key, queries[indexes[0]].strip(), admission): key
+                for key, indexes in pending.items()
+            }
+            yield from ready
+            for future in as_completed(futures):
+                result = future.result()
+                for index in pending[futures[future]]:
+                    yield index, self.result_for_query(result, queries[index].strip())
+    
+    def maybe_prefetch_album(self, score: float, record: TrackRecord) -> None:
+        """Fetch the album of a confident match in the background, once per album"""
+        if (not self.albums or not record.album_id or score < self.album_threshold
+                or self.albums.known(record.album_id) or not hasattr(self.ytmusic, 'get_album')):
+            return
+        outcome = self.album_fetcher.schedule(record.album_id, record.album or record.album_id)
+        metrics.inc('ytmusic_album_prefetch_total', outcome=outcome)
+    
+    def prefetch_album(self, browse_id: str, name: str) -> bool:
+        """Fetch and index an album's tracks on the background budget; False when it was turned away"""
+        admission = Admission.create(BACKGROUND, float(os.environ.get('YTMUSIC_REFRESH_DEADLINE', 60)),
+                                     self.refresh_scheduler)
+        try:
+            self.admit(admission)
+        except AdmissionError:
+            metrics.inc('ytmusic_album_prefetch_total', outcome='throttled')
+            return False
+        
+        metrics.inc('ytmusic_upstream_calls_total', strategy='album')
+        started = time.monotonic()
+        ok = False
+        try:
+            album = self.ytmusic.get_album(browse_id)
+            ok = True
+        finally:
+            elapsed = time.monotonic() - started
+            self.breaker.record(ok, elapsed)
+            metrics.observe('ytmusic_upstream_seconds', elapsed, strategy='album')
+            if not ok:
+                metrics.inc('ytmusic_upstream_errors_total', strategy='album')
+                self.albums.failed(browse_id)
+        
+        tracks = self.albums.add(browse_id, album)
+        if self.catalog and tracks:
+            self.catalog.add(tracks)
+        metrics.inc('ytmusic_album_prefetch_total', outcome='fetched')
+        return True
+    
+    def resolve_and_cache(self, key: str, query: str, admission: Optional[Admission] = None) -> Dict[str, Any]:
+        """Resolve a query upstream and record the result before waiting callers are released"""
+        result = self.resolve_query(query, admission)
+        if "error" not in result:
+            self.cache.set(key, result, negative=not result.get("results"))
+            if self.store and result.get("results"):
+                self.store.put(key, self.result_for_query(result, query))
+        return result
+    
+    def result_for_query(self, result: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """Re-address a cached result to the caller's original query"""
+        result = dict(result)
+        if "query" in result:
+            result["query"] = query
+        if result.get("results"):
+            result["results"] = [self.verified_cover(item) for item in result["results"]]
+        if "message" in result:
+            result["message"] = f"No results found for: {query}"
+        return result
+    
+    def verified_cover(self, item: Union[TrackRecord, Dict[str, Any]]) -> Dict[str, Any]:
+        """Response dict for a cached result, with the verified cover once the background check has finished"""
+        if isinstance(item, TrackRecord):
+            return item.to_payload(self.thumbnails.lookup(item.video_id))
+        cover = self.thumbnails.lookup(item.get("videoId"))
+        if cover is None or cover == item.get("thumbnail"):
+            return item
+        return dict(item, thumbnail=cover)
+    
+    def resolve_query(self, query: str, admission: Optional[Admission] = None) -> Dict[str, Any]:
+        """Run the upstream search and build the response, bypassing the cache"""
+        try:
+            results = self.search_with_fallbacks(query, admission)
+            
+            if not results:
+                return {"results": [], "message": f"No results found for: {query}"}
+            
+            # Raw results are reduced to compact records once; only the records are kept
+            records = [TrackRecord.from_result(result) for result in results]
+            with metrics.timer('ytmusic_stage_seconds', stage='score'):
+                if self.scoring_mode == 'legacy':
+                    scores = self.score_results(results, query)
+                else:
+                    scores = score_records(records, query)
+                scored_results = list(zip(scores, records))
+                scored_results.sort(key=lambda x: x[0], reverse=True)
+            self.maybe_prefetch_album(*scored_results[0])
+            
+            processed_results = []
+            for score, record in scored_results[:3]:
+                try:
+                    if not record.video_id:
+                        continue
+                    
+                    with metrics.timer('ytmusic_stage_seconds', stage='thumbnail'):
+                        record.cover = self.thumbnails.resolve(record.video_id, record.thumbnails())
+                    record.score = score
+                    
+                    processed_results.append(record)
+                    
+                except Exception as e:
+                    logger.error(f"Error processing result: {e}")
+                    continue
+            
+            return {
+                "results": processed_results,
+                "query": query,
+                "totalFound": len(results),
+                "searchStrategy": "enhanced_track_artist_album"
+            }
+            
+        except AdmissionError:
+            raise
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            return {"error": f"Search failed: {str(e)}"}
+
+def compact_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """A served result (e.g. read back from the store) with its results turned back into records"""
+    if not payload.get("results"):
+        return payload
+    return dict(payload, results=[
+        item if isinstance(item, TrackRecord) else TrackRecord.from_payload(item)
+        for item in payload["results"]
+    ])
+
+def simple_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a detailed result to the backward compatible single-result format (/search, api.py)"""
+    if "results" in result and result["results"]:
+        first_result = result["results"][0]
+        return {
+            "results": [{
+                "videoId": first_result["videoId"],
+                "thumbnails": first_result.get("thumbnails", []),
+                "title": first_result.get("title", ""),
+                "artists": first_result.get("artists", []),
+                "thumbnail": first_result.get("thumbnail"),
+                "album": first_result.get("album")
+            }]
+        }
+    
+    return result
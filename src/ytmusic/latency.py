@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rolling latency window used to tune hedged upstream requests
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyWindow:
+    """Keeps the most recent latency samples (seconds) and answers percentile queries"""
+
+    def __init__(self, size: int = 256):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile of the current window, None while it is empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+        return samples[rank]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "samples": len(self),
+            "p50Ms": ms(self.percentile(50)),
+            "p95Ms": ms(self.percentile(95)),
+            "p99Ms": ms(self.percentile(99))
+        }
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Prometheus-style metrics for the YouTube Music search service
+Counters, gauges and latency histograms rendered in the Prometheus text format. When disabled
+every recording call returns immediately and timers are a shared no-op, so the hooks can stay
+in the hot path.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Latency buckets in seconds, from in-process stages up to the Node client's 15 s timeout
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, str]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.total = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """A small metrics registry; metric kinds are declared up front with their help text"""
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def declare(self, kind: str, name: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+        if kind == 'histogram':
+            self._histograms.setdefault(name, {})
+        else:
+            self._values.setdefault(name, {})
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]) -> None:
+        """Register a callback returning {gauge name: value}, sampled at scrape time"""
+        self._collectors.append(collector)
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            histogram.total += seconds
+            histogram.count += 1
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram.counts[index] += 1
+                    break
+
+    def timer(self, name: str, **labels):
+        """Context manager observing the elapsed time of its block into histogram `name`"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name, labels)
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = key + extra
+        if not pairs:
+            return ''
+        escaped = (f'{k}="{v}"'.replace('\n', '\\n') for k, v in pairs)
+        return '{' + ','.join(escaped) + '}'
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        collected: Dict[str, float] = {}
+        for collector in self._collectors:
+            collected.update(collector())
+
+        with self._lock:
+            for name, (kind, help_text) in self._help.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'histogram':
+                    for key, histogram in self._histograms[name].items():
+                        cumulative = 0
+                        for bound, count in zip(self.buckets, histogram.counts):
+                            cumulative += count
+                            lines.append(f"{name}_bucket{self._format_labels(key, (('le', repr(bound)),))} {cumulative}")
+                        lines.append(f"{name}_bucket{self._format_labels(key, (('le', '+Inf'),))} {histogram.count}")
+                        lines.append(f"{name}_sum{self._format_labels(key)} {histogram.total}")
+                        lines.append(f"{name}_count{self._format_labels(key)} {histogram.count}")
+                else:
+                    for key, value in self._values[name].items():
+                        lines.append(f"{name}{self._format_labels(key)} {value}")
+
+        for name, value in collected.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        return '\n'.join(lines) + '\n'
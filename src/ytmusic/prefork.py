@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Pre-fork worker supervisor for the YouTube Music Search API
+The master binds the listening socket once and runs SERVER_WORKERS copies of server.py
+that all accept on it. Workers share resolved tracks through the persistent result store.
+
+Signals (sent to the master):
+    SIGHUP           graceful reload: start a new set of workers, then retire the old ones
+    SIGTERM, SIGINT  graceful shutdown
+"""
+
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Environment variables used to hand the inherited descriptors to a worker
+LISTEN_FD_ENV = 'YTMUSIC_LISTEN_FD'
+READY_FD_ENV = 'YTMUSIC_READY_FD'
+
+# Seconds the master waits for a stopping worker before killing it
+GRACEFUL_TIMEOUT = float(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+
+
+class Worker:
+    def __init__(self, process: subprocess.Popen, ready_fd: int):
+        self.process = process
+        self.ready_fd = ready_fd
+        self.ready = False
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until the worker reports readiness on its pipe, exits, or timeout passes"""
+        deadline = time.monotonic() + timeout
+        while not self.ready:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.process.poll() is not None:
+                return False
+            readable, _, _ = select.select([self.ready_fd], [], [], min(remaining, 0.5))
+            if readable and os.read(self.ready_fd, 1):
+                self.ready = True
+        return True
+
+    def close(self) -> None:
+        try:
+            os.close(self.ready_fd)
+        except OSError:
+            pass
+
+
+class PreforkMaster:
+    """Supervises a fixed number of worker processes sharing one listening socket"""
+
+    def __init__(self, host: str, port: int, workers: int, argv: List[str],
+                 ready_timeout: float = 60, graceful_timeout: float = GRACEFUL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, workers)
+        self.argv = argv
+        self.ready_timeout = ready_timeout
+        self.graceful_timeout = graceful_timeout
+        self.sock: Optional[socket.socket] = None
+        self.workers: List[Worker] = []
+        self._stopping = False
+        self._reload_requested = False
+
+    def spawn(self) -> Worker:
+        read_fd, write_fd = os.pipe()
+        env = dict(os.environ)
+        env[LISTEN_FD_ENV] = str(self.sock.fileno())
+        env[READY_FD_ENV] = str(write_fd)
+        process = subprocess.Popen(self.argv, env=env, pass_fds=(self.sock.fileno(), write_fd))
+        os.close(write_fd)
+        return Worker(process, read_fd)
+
+    def stop_workers(self, workers: List[Worker]) -> None:
+        """SIGTERM the given workers and SIGKILL any still running after the graceful timeout"""
+        for worker in workers:
+            if worker.process.poll() is None:
+                worker.process.send_signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        for worker in workers:
+            try:
+                worker.process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.error(f"Worker {worker.pid} did not stop in time, killing it")
+                worker.process.kill()
+                worker.process.wait()
+            worker.close()
+
+    def reload(self) -> None:
+        """Bring up a fresh set of workers before retiring the current ones"""
+        self._reload_requested = False
+        fresh = [self.spawn() for _ in range(self.num_workers)]
+        if not all(worker.wait_ready(self.ready_timeout) for worker in fresh):
+            logger.error("Reload aborted: new workers did not become ready")
+            self.stop_workers(fresh)
+            return
+
+        retired, self.workers = self.workers, fresh
+        self.stop_workers(retired)
+        print(f"Reloaded {len(fresh)} workers", flush=True)
+
+    def replace_exited(self) -> None:
+        for index, worker in enumerate(self.workers):
+            if worker.process.poll() is None:
+                continue
+            logger.error(f"Worker {worker.pid} exited with code {worker.process.returncode}, restarting")
+            worker.close()
+            self.workers[index] = self.spawn()
+            time.sleep(1)
+
+    def _on_reload(self, signum, frame) -> None:
+        self._reload_requested = True
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def run(self) -> None:
+        self.sock = socket.create_server((self.host, self.port), backlog=2048)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        self.workers = [self.spawn() for _ in range(self.num_workers)]
+        ready = sum(worker.wait_ready(self.ready_timeout) for worker in self.workers)
+        print(f"{ready}/{self.num_workers} workers ready (master pid {os.getpid()})", flush=True)
+
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self.reload()
+                self.replace_exited()
+                time.sleep(0.5)
+        finally:
+            self.stop_workers(self.workers)
+            self.sock.close()
+
+
+def inherited_socket() -> Optional[socket.socket]:
+    """The listening socket handed down by the master, or None outside a worker"""
+    fd = os.environ.get(LISTEN_FD_ENV)
+    if fd is None:
+        return None
+    return socket.socket(fileno=int(fd))
+
+
+def notify_ready() -> None:
+    """Tell the master this worker has initialized and is about to accept connections"""
+    fd = os.environ.pop(READY_FD_ENV, None)
+    if fd is None:
+        return
+    try:
+        os.write(int(fd), b'1')
+        os.close(int(fd))
+    except OSError as e:
+        logger.error(f"Failed to signal readiness: {e}")
+
+
+def drain_timeout() -> float:
+    """How long a stopping worker may spend finishing in-flight requests, well inside GRACEFUL_TIMEOUT"""
+    return GRACEFUL_TIMEOUT * 0.8
+
+
+def install_worker_signals() -> threading.Event:
+    """Workers leave Ctrl+C to the master; SIGTERM sets the returned event so the worker can drain"""
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop)
+    return stopping
+
+
+def run_master(host: str, port: int, workers: int) -> None:
+    argv = [sys.executable, os.path.abspath(sys.argv[0])] + sys.argv[1:]
+    PreforkMaster(host, port, workers, argv).run()
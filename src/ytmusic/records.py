@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compact track records for the YouTube Music search service
+Raw ytmusicapi results carry every thumbnail size and many keys nothing reads. They are turned
+into slotted records once, right after the upstream search: artist and album names are interned,
+so the many cached results of one album share a single copy, and only the best thumbnail is kept.
+Cached results hold these records; response dicts are built from them when a result is served.
+"""
+
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from scoring import CandidateTokens, QueryTokens, candidate_tokens, score_tokens
+from thumbnails import best_thumbnail
+
+
+def intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class TrackRecord:
+    """One search result: the fields resolve_query and the responses read, nothing else"""
+    __slots__ = ('video_id', 'title', 'artists', 'album', 'duration', 'result_type',
+                 'thumbnail', 'width', 'height', 'cover', 'score', 'album_id')
+
+    def __init__(self, video_id: str, title: str, artists: Tuple[str, ...], album: Optional[str],
+                 duration: Optional[int], result_type: str, thumbnail: Optional[str] = None,
+                 width: int = 0, height: int = 0, cover: Optional[str] = None, score: float = 0.0,
+                 album_id: Optional[str] = None):
+        self.video_id = video_id
+        self.title = title
+        self.artists = tuple(intern(name) for name in artists)
+        self.album = intern(album)
+        self.duration = duration
+        self.result_type = intern(result_type)
+        self.thumbnail = thumbnail
+        self.width = width
+        self.height = height
+        # Upgraded cover URL served as "thumbnail", and the relevance score, once resolved
+        self.cover = cover
+        self.score = score
+        # Album browseId, used to prefetch the rest of the album; not served
+        self.album_id = intern(album_id)
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "TrackRecord":
+        """Record for a raw ytmusicapi (or catalog) search result"""
+        album = result.get('album')
+        best = best_thumbnail(result.get('thumbnails') or []) or {}
+        return cls(
+            result.get('videoId'),
+            result.get('title', '') or '',
+            tuple(artist.get('name', '') or '' for artist in result.get('artists') or []),
+            album.get('name') if isinstance(album, dict) else None,
+            result.get('duration_seconds'),
+            result.get('resultType', 'song'),
+            best.get('url'),
+            best.get('width', 0),
+            best.get('height', 0),
+            album_id=album.get('id') if isinstance(album, dict) else None
+        )
+
+    @classmethod
+    def from_payload(cls, item: Dict[str, Any]) -> "TrackRecord":
+        """Record for a result as it was served (read back from the persistent store)"""
+        thumbnails = item.get('thumbnails') or []
+        best = best_thumbnail(thumbnails) or {}
+        return cls(
+            item.get('videoId'),
+            item.get('title', ''),
+            tuple(item.get('artists') or ()),
+            item.get('album'),
+            item.get('duration'),
+            item.get('resultType', 'song'),
+            best.get('url'),
+            best.get('width', 0),
+            best.get('height', 0),
+            item.get('thumbnail'),
+            item.get('relevanceScore', 0.0)
+        )
+
+    def tokens(self) -> CandidateTokens:
+        return candidate_tokens(self.title, self.artists, self.album)
+
+    def thumbnails(self) -> List[Dict[str, Any]]:
+        if not self.thumbnail:
+            return []
+        return [{"url": self.thumbnail, "width": self.width, "height": self.height}]
+
+    def to_payload(self, cover: Optional[str] = None) -> Dict[str, Any]:
+        """The result as served by /search/detailed"""
+        return {
+            "videoId": self.video_id,
+            "title": self.title,
+            "artists": [name for name in self.artists if name],
+            "thumbnail": cover or self.cover,
+            "thumbnails": self.thumbnails(),
+            "relevanceScore": round(self.score, 3),
+            "duration": self.duration,
+            "album": self.album,
+            "resultType": self.result_type
+        }
+
+
+def score_records(records: List[TrackRecord], query: str) -> List[float]:
+    """Same scores as scoring.score_results gives the raw results the records were built from"""
+    tokens = QueryTokens(query)
+    return [score_tokens(tokens, record.tokens(), bool(record.duration)) for record in records]
+
+
+def deep_sizeof(value: Any, seen: set) -> int:
+    """Bytes held by value and everything it references that is not in seen yet"""
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    elif isinstance(value, TrackRecord):
+        size += sum(deep_sizeof(getattr(value, slot), seen) for slot in TrackRecord.__slots__)
+    return size
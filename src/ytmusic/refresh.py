@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Background refresh for the YouTube Music search service
+Re-resolves expired or pre-warmed queries on a small dedicated thread pool, so the request that
+found a stale entry is answered right away and nobody waits for the refresh.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED = 'scheduled'
+PENDING = 'pending'
+DROPPED = 'dropped'
+
+
+class BackgroundRefresher:
+    """Runs refresh(key, query) at most once per key at a time, with a bounded backlog"""
+
+    def __init__(self, refresh: Callable[[str, str], bool], workers: int = 2, max_pending: int = 500):
+        self.refresh = refresh
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ytmusic-refresh')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.refreshed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def schedule(self, key: str, query: str) -> str:
+        """Queue a refresh; returns SCHEDULED, PENDING (already queued) or DROPPED (backlog full)"""
+        with self._lock:
+            if key in self._pending:
+                return PENDING
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return DROPPED
+            self._pending.add(key)
+            self.scheduled += 1
+
+        try:
+            self._executor.submit(self._run, key, query)
+        except RuntimeError:
+            # Executor shut down at exit
+            with self._lock:
+                self._pending.discard(key)
+            return DROPPED
+        return SCHEDULED
+
+    def _run(self, key: str, query: str) -> None:
+        try:
+            if self.refresh(key, query):
+                self.refreshed += 1
+            else:
+                self.skipped += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Background refresh failed for '{query}': {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "maxPending": self.max_pending,
+            "scheduled": self.scheduled,
+            "refreshed": self.refreshed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
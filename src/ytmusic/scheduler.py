@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Admission control for upstream YouTube Music calls
+A token bucket caps upstream QPS; callers that find it empty wait in a bounded priority queue
+(interactive before background) and are dropped once their deadline has passed.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+PRIORITIES = {INTERACTIVE: 0, BACKGROUND: 1}
+
+
+class AdmissionError(Exception):
+    """The upstream call was not admitted; callers fall back to stale data or fail fast"""
+
+
+class QueueFull(AdmissionError):
+    pass
+
+
+class DeadlineExceeded(AdmissionError):
+    pass
+
+
+class Admission(NamedTuple):
+    """Who is asking for an upstream call: priority class, absolute monotonic deadline,
+    for work with its own budget the scheduler to draw from instead of the default one and,
+    for callers with a fallback answer, the most seconds one call may wait in the queue"""
+    priority: str
+    deadline: float
+    scheduler: Optional["UpstreamScheduler"] = None
+    max_wait: Optional[float] = None
+
+    @classmethod
+    def create(cls, priority: str, budget: float,
+               scheduler: Optional["UpstreamScheduler"] = None) -> "Admission":
+        if priority not in PRIORITIES:
+            priority = INTERACTIVE
+        return cls(priority, time.monotonic() + budget, scheduler)
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own, the scheduler holds the lock"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ('deadline', 'event', 'granted', 'abandoned')
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.event = threading.Event()
+        self.granted = False
+        self.abandoned = False
+
+
+class UpstreamScheduler:
+    """Token-bucket rate limit with a bounded, deadline-aware priority queue; rate <= 0 disables it"""
+
+    def __init__(self, rate: float, burst: float, max_queue: int):
+        self.enabled = rate > 0
+        self.bucket = TokenBucket(rate, burst) if self.enabled else None
+        self.max_queue = max_queue
+        self._heap: list = []
+        self._waiting = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _dispatch(self, now: float) -> None:
+        """Hand available tokens to the highest-priority live waiters; drop expired ones"""
+        while self._heap:
+            waiter = self._heap[0][2]
+            if waiter.abandoned:
+                heapq.heappop(self._heap)
+                continue
+            if waiter.deadline <= now:
+                heapq.heappop(self._heap)
+                waiter.event.set()
+                continue
+            if not self.bucket.try_take(now):
+                return
+            heapq.heappop(self._heap)
+            waiter.granted = True
+            waiter.event.set()
+
+    def acquire(self, admission: Admission) -> None:
+        """Block until the call may go upstream; raises QueueFull or DeadlineExceeded"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._dispatch(now)
+            if not self._waiting and self.bucket.try_take(now):
+                self.admitted += 1
+                return
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull("Upstream queue is full")
+            deadline = admission.deadline
+            if admission.max_wait is not None:
+                deadline = min(deadline, now + admission.max_wait)
+            if deadline <= now:
+                self.expired += 1
+                raise DeadlineExceeded("No upstream slot free and the caller does not wait")
+            waiter = _Waiter(deadline)
+            entry = (PRIORITIES.get(admission.priority, 0), next(self._sequence), waiter)
+            heapq.heappush(self._heap, entry)
+            self._waiting += 1
+            self.queued += 1
+
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._dispatch(now)
+                    if waiter.granted:
+                        self.admitted += 1
+                        return
+                    if waiter.deadline <= now:
+                        waiter.abandoned = True
+                        self.expired += 1
+                        raise DeadlineExceeded("Request deadline passed while queued for upstream")
+                    timeout = min(waiter.deadline - now, self.bucket.wait_time())
+                waiter.event.wait(max(timeout, 0.001))
+                waiter.event.clear()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rate": self.bucket.rate if self.enabled else None,
+                "burst": self.bucket.burst if self.enabled else None,
+                "maxQueue": self.max_queue,
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "expired": self.expired
+            }
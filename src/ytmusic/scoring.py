@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Precompiled relevance scoring for search results
+Produces exactly the same scores as YTMusicSearcher.score_result_relevance, but tokenizes
+the query once per request and caches the tokenized fields of each candidate
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+
+class QueryTokens:
+    """Query-side work of the relevance score, done once per request"""
+    __slots__ = ('lower', 'words', 'word_count')
+
+    def __init__(self, query: str):
+        self.lower = query.lower()
+        self.words = frozenset(self.lower.split())
+        self.word_count = len(self.words)
+
+
+class CandidateTokens:
+    """Tokenized title, artist and album fields of one search result"""
+    __slots__ = ('title', 'title_words', 'artist_words', 'artist_names', 'album_words')
+
+    def __init__(self, title: str, artist_names: Tuple[str, ...], album_name: Optional[str]):
+        self.title = title.lower()
+        self.title_words = frozenset(self.title.split())
+
+        joined = ' '.join(artist_names).lower()
+        self.artist_words: Optional[FrozenSet[str]] = frozenset(joined.split()) if joined else None
+        self.artist_names = tuple(name.lower() for name in artist_names)
+
+        album = album_name.lower() if album_name else ''
+        self.album_words: Optional[FrozenSet[str]] = frozenset(album.split()) if album else None
+
+
+@lru_cache(maxsize=8192)
+def candidate_tokens(title: str, artist_names: Tuple[str, ...], album_name: Optional[str]) -> CandidateTokens:
+    return CandidateTokens(title, artist_names, album_name)
+
+
+def tokens_for_result(result: Dict[str, Any]) -> CandidateTokens:
+    artists = result.get('artists') or []
+    album_info = result.get('album')
+    album_name = album_info.get('name', '') if isinstance(album_info, dict) else None
+    return candidate_tokens(
+        result.get('title', '') or '',
+        tuple(artist.get('name', '') or '' for artist in artists),
+        album_name
+    )
+
+
+def score_tokens(query: QueryTokens, candidate: CandidateTokens, has_duration: bool) -> float:
+    """Same arithmetic, in the same order, as score_result_relevance"""
+    score = 0.0
+    words = query.words
+    count = query.word_count
+
+    title = candidate.title
+    if title:
+        if query.lower in title or title in query.lower:
+            score += 0.6
+        if count:
+            score += (len(words & candidate.title_words) / count) * 0.4
+
+    if candidate.artist_words is not None:
+        if count:
+            score += (len(words & candidate.artist_words) / count) * 0.3
+        for name in candidate.artist_names:
+            if name and name in query.lower:
+                score += 0.2
+
+    if candidate.album_words is not None and count:
+        score += (len(words & candidate.album_words) / count) * 0.15
+
+    if len(title) > 100:
+        score *= 0.9
+
+    if has_duration:
+        score += 0.05
+
+    return min(score, 1.0)
+
+
+def score_results(results: List[Dict[str, Any]], query: str) -> List[float]:
+    """Score every candidate of one request in a single pass"""
+    tokens = QueryTokens(query)
+    return [
+        score_tokens(tokens, tokens_for_result(result), bool(result.get('duration_seconds')))
+        for result in results
+    ]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Response shaping and encoding for the YouTube Music search service
+Field projection (`fields=`, `compact`), JSON encoding through orjson when it is installed, and
+NDJSON framing for streamed batch results.
+"""
+
+import json
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+# Compact responses carry only what is needed to link and show a track
+COMPACT_FIELDS = frozenset(('videoId', 'thumbnail'))
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode payload as UTF-8 JSON"""
+    if orjson:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def truthy(value: Any) -> bool:
+    """Flag values as they arrive from query strings or JSON bodies"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def parse_fields(fields: Any = None, compact: Any = False) -> Optional[FrozenSet[str]]:
+    """Result fields to keep: a comma-separated string or list; None keeps every field"""
+    if fields:
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        selected = frozenset(str(field).strip() for field in fields if str(field).strip())
+        if selected:
+            return selected
+    return COMPACT_FIELDS if truthy(compact) else None
+
+
+def project(payload: Dict[str, Any], fields: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    """Keep only `fields` in each entry of payload["results"]; other keys are left untouched"""
+    results = payload.get("results")
+    if fields is None or not isinstance(results, list):
+        return payload
+
+    projected = dict(payload)
+    projected["results"] = [
+        {key: value for key, value in result.items() if key in fields}
+        for result in results
+    ]
+    return projected
+
+
+def ndjson(items: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """One JSON document per line"""
+    for item in items:
+        yield dumps(item) + b'\n'
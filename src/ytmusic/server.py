@@ -4,16 +4,22 @@ YouTube Music Search Flask API Server
 Provides a RESTful API for searching YouTube Music tracks
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from waitress import serve
+from waitress import serve, create_server, wasyncore
+from waitress.channel import HTTPChannel
 import logging
-import json
-import re
 import os
 import sys
-from typing import Dict, List, Optional, Any
-from ytmusicapi import YTMusic
+import threading
+import time
+import functools
+from typing import Dict, FrozenSet, Iterator, Optional, Any, Tuple
+import prefork
+from engine import YTMusicSearcher, metrics, simple_result
+from transport import connection_stats
+from scheduler import INTERACTIVE, BACKGROUND
+from serialization import dumps, ndjson, parse_fields, project, truthy, JSON_MIMETYPE, NDJSON_MIMETYPE
 
 # Setup logging to only show errors
 logging.basicConfig(level=logging.ERROR)
@@ -25,263 +31,268 @@ logging.getLogger('werkzeug').setLevel(logging.ERROR)
 app = Flask(__name__)
 CORS(app, origins=['http://localhost:*', 'http://127.0.0.1:*'])
 
-class YTMusicSearcher:
-    def __init__(self):
-        try:
-            self.ytmusic = YTMusic()
-            logger.info("YTMusic API initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize YTMusic: {e}")
-            self.ytmusic = None
+_searcher: Optional[YTMusicSearcher] = None
+_searcher_lock = threading.Lock()
+
+def get_searcher() -> YTMusicSearcher:
+    """Shared searcher, created on first use so the pre-fork master never builds one"""
+    global _searcher
+    if _searcher is None:
+        with _searcher_lock:
+            if _searcher is None:
+                _searcher = YTMusicSearcher()
+    return _searcher
+
+def health_payload() -> Dict[str, Any]:
+    """Health report shared by the WSGI and ASGI entry points"""
+    searcher = get_searcher()
+    breaker = searcher.breaker.stats()
+    if not searcher.ytmusic:
+        status = "unhealthy"
+    elif breaker["state"] != "closed":
+        # Still ready: cached tracks are served and restarting would not bring YouTube Music back
+        status = "degraded"
+    else:
+        status = "healthy"
+    return {
+        "status": status,
+        "ready": searcher.ytmusic is not None,
+        "service": "YouTube Music Search API",
+        "version": "1.0.0",
+        "pid": os.getpid(),
+        "backend": searcher.backend_kind,
+        "cache": searcher.cache.stats(),
+        "memory": searcher.memory_stats(),
+        "store": searcher.store.stats() if searcher.store else None,
+        "singleflight": searcher.inflight.stats(),
+        "strategies": dict(
+            searcher.planner.stats(),
+            mode=searcher.strategy_mode,
+            hedgeDelay=round(searcher.hedge_delay(), 3) if searcher.strategy_mode == 'hedged' else None,
+            upstreamLatency=searcher.upstream_latency.summary()
+        ),
+        "upstream": connection_stats(searcher.session) if searcher.session else None,
+        "scheduler": searcher.scheduler.stats(),
+        "breaker": dict(breaker, upstreamLatency=searcher.upstream_latency.summary()),
+        "thumbnails": searcher.thumbnails.stats(),
+        "catalog": searcher.catalog.stats() if searcher.catalog else None,
+        "albums": dict(searcher.albums.stats(), prefetch=searcher.album_fetcher.stats()) if searcher.albums else None,
+        "refresh": dict(searcher.refresher.stats(), budget=searcher.refresh_scheduler.stats())
+    }
+
+def health_status_code(payload: Dict[str, Any]) -> int:
+    """Readiness probes (start.sh, the pre-fork master) treat anything but 200 as not ready"""
+    return 200 if payload["ready"] else 503
+
+def batch_options(data: Dict[str, Any]) -> Tuple[Optional[str], int, str]:
+    """Validate a /search/batch body; returns (error message, concurrency, priority)"""
+    queries = data.get('queries')
+    max_concurrency = int(os.environ.get('YTMUSIC_BATCH_CONCURRENCY', 4))
+    priority = data.get('priority', BACKGROUND)
     
-    def normalize_query(self, query: str) -> str:
-        """Normalize search query for better matching while preserving Unicode"""
-        query = re.sub(r'[^\w\s\-\u00C0-\u017F\u0400-\u04FF\u0600-\u06FF\u4E00-\u9FFF\u3040-\u309F\u30A0-\u30FF\uAC00-\uD7AF]', ' ', query, flags=re.UNICODE)
-        query = re.sub(r'\s+', ' ', query).strip()
-        return query
+    if not isinstance(queries, list) or not queries:
+        return "Body field 'queries' must be a non-empty list", max_concurrency, priority
     
-    def extract_best_thumbnail(self, thumbnails: List[Dict]) -> Optional[str]:
-        """Extract the best quality thumbnail URL"""
-        if not thumbnails:
-            return None
-        
-        sorted_thumbnails = sorted(
-            thumbnails, 
-            key=lambda x: (x.get('width', 0) * x.get('height', 0)), 
-            reverse=True
-        )
-        
-        best_thumbnail = sorted_thumbnails[0]
-        thumbnail_url = best_thumbnail.get('url', '')
-        
-        if thumbnail_url:
-            thumbnail_url = re.sub(r'w\d+-h\d+', 'w1080-h1080', thumbnail_url)
-            if 'mqdefault' in thumbnail_url:
-                thumbnail_url = thumbnail_url.replace('mqdefault', 'maxresdefault')
-            elif 'hqdefault' in thumbnail_url:
-                thumbnail_url = thumbnail_url.replace('hqdefault', 'maxresdefault')
-        
-        return thumbnail_url
+    max_size = int(os.environ.get('YTMUSIC_BATCH_MAX_SIZE', 50))
+    if len(queries) > max_size:
+        return f"Batch too large: at most {max_size} queries are allowed", max_concurrency, priority
     
-    def search_with_fallbacks(self, query: str) -> List[Dict[str, Any]]:
-        """Search with multiple strategies for better accuracy"""
-        search_query = self.normalize_query(query)
-        
-        search_strategies = [
-            {'filter': 'songs', 'limit': 5},
-            {'filter': 'videos', 'limit': 3},
-            {'filter': None, 'limit': 2}
-        ]
-        
-        for strategy in search_strategies:
-            try:
-                filter_type = strategy.get('filter')
-                limit = strategy.get('limit', 5)
-                
-                results = self.ytmusic.search(
-                    search_query, 
-                    filter=filter_type, 
-                    limit=limit
-                )
-                
-                if results and len(results) > 0:
-                    music_results = [
-                        r for r in results 
-                        if r.get('videoId') and r.get('title') and 
-                        not r.get('resultType') in ['playlist', 'channel', 'podcast']
-                    ]
-                    
-                    if music_results:
-                        return music_results
-                    
-            except Exception as e:
-                logger.error(f"Search strategy {strategy} failed: {e}")
-                continue
-        
-        return []
+    try:
+        concurrency = min(int(data.get('concurrency', max_concurrency)), max_concurrency)
+    except (TypeError, ValueError):
+        concurrency = max_concurrency
     
-    def score_result_relevance(self, result: Dict, original_query: str) -> float:
-        """Enhanced scoring for track + artist + album queries"""
-        score = 0.0
-        query_lower = original_query.lower()
-        query_words = set(query_lower.split())
-        
-        title = result.get('title', '').lower()
-        if title:
-            if query_lower in title or title in query_lower:
-                score += 0.6
-            
-            title_words = set(title.split())
-            word_overlap = len(query_words.intersection(title_words))
-            if query_words:
-                score += (word_overlap / len(query_words)) * 0.4
-        
-        artists = result.get('artists', [])
-        if artists:
-            artist_names = ' '.join([artist.get('name', '') for artist in artists]).lower()
-            if artist_names:
-                artist_words = set(artist_names.split())
-                artist_overlap = len(query_words.intersection(artist_words))
-                if query_words:
-                    score += (artist_overlap / len(query_words)) * 0.3
-                
-                for artist in artists:
-                    artist_name = artist.get('name', '').lower()
-                    if artist_name and artist_name in query_lower:
-                        score += 0.2
-        
-        album_info = result.get('album')
-        if album_info and isinstance(album_info, dict):
-            album_name = album_info.get('name', '').lower()
-            if album_name:
-                album_words = set(album_name.split())
-                album_overlap = len(query_words.intersection(album_words))
-                if query_words:
-                    score += (album_overlap / len(query_words)) * 0.15
-        
-        if len(title) > 100:
-            score *= 0.9
-        
-        if result.get('duration_seconds'):
-            score += 0.05
-            
-        return min(score, 1.0)
+    return None, concurrency, priority
+
+def batch_response(data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Validate a /search/batch body and resolve it; returns (payload, status code)"""
+    error, concurrency, priority = batch_options(data)
+    if error:
+        return {"error": error}, 400
     
-    def search_ytmusic(self, query: str) -> Dict[str, Any]:
-        """Enhanced search function with better accuracy and cover art"""
-        try:
-            if not self.ytmusic:
-                return {"error": "YTMusic API not initialized"}
-            
-            if not query or len(query.strip()) < 2:
-                return {"error": "Query too short"}
-            
-            results = self.search_with_fallbacks(query)
-            
-            if not results:
-                return {"results": [], "message": f"No results found for: {query}"}
-            
-            scored_results = []
-            for result in results:
-                score = self.score_result_relevance(result, query)
-                scored_results.append((score, result))
-            
-            scored_results.sort(key=lambda x: x[0], reverse=True)
-            
-            processed_results = []
-            for score, result in scored_results[:3]:
-                try:
-                    video_id = result.get('videoId')
-                    if not video_id:
-                        continue
-                    
-                    thumbnails = result.get('thumbnails', [])
-                    best_thumbnail = self.extract_best_thumbnail(thumbnails)
-                    
-                    artists_info = result.get('artists', [])
-                    artist_names = []
-                    if artists_info:
-                        artist_names = [artist.get('name', '') for artist in artists_info if artist.get('name')]
-                    
-                    processed_result = {
-                        "videoId": video_id,
-                        "title": result.get('title', ''),
-                        "artists": artist_names,
-                        "thumbnail": best_thumbnail,
-                        "thumbnails": thumbnails,
-                        "relevanceScore": round(score, 3),
-                        "duration": result.get('duration_seconds'),
-                        "album": result.get('album', {}).get('name') if result.get('album') else None,
-                        "resultType": result.get('resultType', 'song')
-                    }
-                    
-                    processed_results.append(processed_result)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing result: {e}")
-                    continue
-            
-            return {
-                "results": processed_results,
-                "query": query,
-                "totalFound": len(results),
-                "searchStrategy": "enhanced_track_artist_album"
-            }
-            
-        except Exception as e:
-            logger.error(f"Search error: {e}")
-            return {"error": f"Search failed: {str(e)}"}
-
-# Initialize the searcher globally
-searcher = YTMusicSearcher()
+    fields = parse_fields(data.get('fields'), data.get('compact'))
+    results = get_searcher().search_batch(data['queries'], concurrency, priority)
+    return {"results": [project(result, fields) for result in results], "total": len(results)}, 200
+
+def batch_stream(data: Dict[str, Any]) -> Iterator[bytes]:
+    """NDJSON lines of {"index": ..., **result} in completion order; call batch_options() first"""
+    _, concurrency, priority = batch_options(data)
+    fields = parse_fields(data.get('fields'), data.get('compact'))
+    items = get_searcher().iter_batch(data['queries'], concurrency, priority)
+    return ndjson(dict(project(result, fields), index=index) for index, result in items)
+
+def wants_stream(data: Dict[str, Any], accept: str) -> bool:
+    """NDJSON is used when the body sets "stream" or the client accepts only NDJSON"""
+    return truthy(data.get('stream')) or accept.split(',')[0].strip() == NDJSON_MIMETYPE
+
+def track_query(entry: Any) -> Optional[str]:
+    """Search string for a /warm entry: a query string or {track, artist, album}, joined like src/youtube.mjs"""
+    if isinstance(entry, str):
+        query = entry.strip()
+    elif isinstance(entry, dict):
+        parts = [str(entry.get(field) or '').strip() for field in ('track', 'artist', 'album')]
+        query = ' '.join(part for part in parts if part)
+    else:
+        return None
+    return query if len(query) >= 2 else None
+
+def warm_response(data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Validate a /warm body and queue its tracks for background resolution"""
+    tracks = data.get('tracks')
+    if not isinstance(tracks, list) or not tracks:
+        return {"error": "Body field 'tracks' must be a non-empty list"}, 400
+    
+    max_size = int(os.environ.get('YTMUSIC_WARM_MAX_SIZE', 200))
+    if len(tracks) > max_size:
+        return {"error": f"Too many tracks: at most {max_size} are allowed"}, 400
+    
+    queries = [track_query(entry) for entry in tracks]
+    valid = list(dict.fromkeys(query for query in queries if query))
+    searcher = get_searcher()
+    counts = searcher.warm(valid) if searcher.ytmusic else {"scheduled": 0, "pending": 0, "dropped": len(valid), "cached": 0}
+    counts["invalid"] = len(queries) - sum(1 for query in queries if query)
+    return counts, 202
+
+def metrics_collector() -> Dict[str, float]:
+    """Cache and coalescing counters sampled on each /metrics scrape"""
+    searcher = get_searcher()
+    cache = searcher.cache.stats()
+    inflight = searcher.inflight.stats()
+    return {
+        "ytmusic_cache_entries": cache["size"],
+        "ytmusic_cache_hits": cache["hits"],
+        "ytmusic_cache_misses": cache["misses"],
+        "ytmusic_cache_evictions": cache["evictions"],
+        "ytmusic_singleflight_executions": inflight["executions"],
+        "ytmusic_singleflight_coalesced": inflight["coalesced"]
+    }
+
+metrics.add_collector(metrics_collector)
+
+def instrumented(endpoint: str):
+    """Count requests, track in-flight requests and time each call of a route"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+            metrics.inc('ytmusic_requests_total', endpoint=endpoint)
+            metrics.inc('ytmusic_requests_in_flight', endpoint=endpoint)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.inc('ytmusic_requests_in_flight', -1, endpoint=endpoint)
+                metrics.observe('ytmusic_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+        return wrapper
+    return decorator
+
+def json_response(payload: Dict[str, Any], status: int = 200):
+    """Encode with the fastest available serializer, timed as the serialization stage"""
+    with metrics.timer('ytmusic_stage_seconds', stage='serialize'):
+        body = dumps(payload)
+    return Response(body, status=status, mimetype=JSON_MIMETYPE)
+
+def request_query() -> str:
+    """Read the search query from GET args or a JSON POST body"""
+    if request.method == 'GET':
+        return request.args.get('q', '').strip()
+    data = request.get_json() or {}
+    return data.get('query', '').strip()
+
+def request_fields() -> Optional[FrozenSet[str]]:
+    """Result projection from the `fields`/`compact` arg or body field; None keeps everything"""
+    if request.method == 'GET':
+        return parse_fields(request.args.get('fields'), request.args.get('compact'))
+    data = request.get_json(silent=True) or {}
+    return parse_fields(data.get('fields'), data.get('compact'))
+
+def request_priority() -> str:
+    """Scheduling class from the `priority` arg/body field; interactive unless told otherwise"""
+    if request.method == 'GET':
+        return request.args.get('priority', INTERACTIVE)
+    data = request.get_json(silent=True) or {}
+    return data.get('priority', INTERACTIVE)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    status = "healthy" if searcher.ytmusic else "unhealthy"
-    return jsonify({
-        "status": status,
-        "service": "YouTube Music Search API",
-        "version": "1.0.0"
-    })
+    payload = health_payload()
+    return jsonify(payload), health_status_code(payload)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics endpoint"""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/search', methods=['GET', 'POST'])
+@instrumented('search')
 def search():
     """Search endpoint for YouTube Music"""
     try:
-        # Handle both GET and POST requests
-        if request.method == 'GET':
-            query = request.args.get('q', '').strip()
-        else:
-            data = request.get_json() or {}
-            query = data.get('query', '').strip()
+        query = request_query()
         
         if not query:
             return jsonify({"error": "Query parameter 'q' or 'query' is required"}), 400
         
-        result = searcher.search_ytmusic(query)
-        
-        # Convert to backward compatible format
-        if "results" in result and result["results"]:
-            first_result = result["results"][0]
-            backward_compatible = {
-                "results": [{
-                    "videoId": first_result["videoId"],
-                    "thumbnails": first_result.get("thumbnails", []),
-                    "title": first_result.get("title", ""),
-                    "artists": first_result.get("artists", []),
-                    "thumbnail": first_result.get("thumbnail"),
-                    "album": first_result.get("album")
-                }]
-            }
-            return jsonify(backward_compatible)
-        
-        return jsonify(result)
+        result = get_searcher().search_ytmusic(query, request_priority())
+        return json_response(project(simple_result(result), request_fields()))
         
     except Exception as e:
+        metrics.inc('ytmusic_errors_total', where='search')
         logger.error(f"Search endpoint error: {e}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 @app.route('/search/detailed', methods=['GET', 'POST'])
+@instrumented('search_detailed')
 def search_detailed():
     """Detailed search endpoint that returns full results with scores"""
     try:
-        if request.method == 'GET':
-            query = request.args.get('q', '').strip()
-        else:
-            data = request.get_json() or {}
-            query = data.get('query', '').strip()
+        query = request_query()
         
         if not query:
             return jsonify({"error": "Query parameter 'q' or 'query' is required"}), 400
         
-        result = searcher.search_ytmusic(query)
-        return jsonify(result)
+        result = get_searcher().search_ytmusic(query, request_priority())
+        return json_response(project(result, request_fields()))
         
     except Exception as e:
+        metrics.inc('ytmusic_errors_total', where='search_detailed')
         logger.error(f"Detailed search endpoint error: {e}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+@app.route('/search/batch', methods=['POST'])
+@instrumented('search_batch')
+def search_batch():
+    """Batch search endpoint: resolves many queries in one request, results in input order"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if wants_stream(data, request.headers.get('Accept', '')) and not batch_options(data)[0]:
+            return Response(batch_stream(data), mimetype=NDJSON_MIMETYPE)
+        
+        payload, status = batch_response(data)
+        return json_response(payload, status)
+        
+    except Exception as e:
+        metrics.inc('ytmusic_errors_total', where='search_batch')
+        logger.error(f"Batch search endpoint error: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@app.route('/warm', methods=['POST'])
+@instrumented('warm')
+def warm():
+    """Pre-warm endpoint: resolve tracks in the background so later lookups hit the cache"""
+    try:
+        payload, status = warm_response(request.get_json(silent=True) or {})
+        return json_response(payload, status)
+        
+    except Exception as e:
+        metrics.inc('ytmusic_errors_total', where='warm')
+        logger.error(f"Warm endpoint error: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -290,18 +301,80 @@ def not_found(error):
 def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
+def in_flight(wsgi_server) -> bool:
+    """Whether any connection is receiving a request, running one or still sending its response"""
+    return any(
+        channel.request is not None or channel.requests or channel.total_outbufs_len
+        for channel in list(wsgi_server._map.values()) if isinstance(channel, HTTPChannel)
+    )
+
+def serve_until_stopped(wsgi_server, stopping: threading.Event, drain_timeout: float) -> None:
+    """Run waitress until stopping is set, then stop accepting and let in-flight requests finish"""
+    adj = wsgi_server.adj
+    # Responses are written by this loop, so it keeps running while the worker drains
+    while not stopping.is_set():
+        wasyncore.loop(timeout=adj.asyncore_loop_timeout, map=wsgi_server._map,
+                       use_poll=adj.asyncore_use_poll, count=1)
+    
+    # The listening socket is shared, so the other workers pick up new connections
+    wsgi_server.accepting = False
+    deadline = time.monotonic() + drain_timeout
+    while in_flight(wsgi_server) and time.monotonic() < deadline:
+        wasyncore.loop(timeout=0.1, map=wsgi_server._map, use_poll=adj.asyncore_use_poll, count=1)
+    if in_flight(wsgi_server):
+        logger.error(f"Worker {os.getpid()} stopping with requests still in flight")
+    
+    wsgi_server.task_dispatcher.shutdown(timeout=max(0.0, deadline - time.monotonic()))
+    wasyncore.close_all(wsgi_server._map)
+
+def serve_worker(listen_socket, server_mode: str, threads: int) -> None:
+    """Run as a pre-fork worker on the socket inherited from the master"""
+    if server_mode == 'asgi':
+        import asgi
+        asgi.run(sock=listen_socket, graceful_timeout=prefork.drain_timeout())
+        return
+    
+    stopping = prefork.install_worker_signals()
+    get_searcher()
+    wsgi_server = create_server(app, sockets=[listen_socket], threads=threads)
+    prefork.notify_ready()
+    serve_until_stopped(wsgi_server, stopping, prefork.drain_timeout())
+
 def main():
     """Main function to run the server"""
     port = int(os.environ.get('PORT', 8080))
     host = os.environ.get('HOST', '127.0.0.1')
+    server_mode = os.environ.get('SERVER_MODE', 'waitress').lower()
+    workers = int(os.environ.get('SERVER_WORKERS', 1))
+    threads = int(os.environ.get('SERVER_THREADS', 6))
+    
+    # Let `import server` inside asgi.py reuse this module instead of re-executing it
+    sys.modules.setdefault('server', sys.modules[__name__])
     
-    print(f"Starting YouTube Music Search API server on {host}:{port}")
+    listen_socket = prefork.inherited_socket()
+    if listen_socket is not None:
+        serve_worker(listen_socket, server_mode, threads)
+        return
+    
+    print(f"Starting YouTube Music Search API server on {host}:{port} ({server_mode}, {workers} worker(s))")
     print(f"Health check: http://{host}:{port}/health")
     print(f"Search endpoint: http://{host}:{port}/search?q=<query>")
     print(f"Detailed search: http://{host}:{port}/search/detailed?q=<query>")
+    print(f"Batch search: POST http://{host}:{port}/search/batch")
+    print(f"Metrics: http://{host}:{port}/metrics")
+    
+    if workers > 1:
+        prefork.run_master(host, port, workers)
+        return
+    
+    if server_mode == 'asgi':
+        import asgi
+        asgi.run(host=host, port=port)
+        return
     
     # Use Waitress as the WSGI server
-    serve(app, host=host, port=port, threads=6)
+    get_searcher()
+    serve(app, host=host, port=port, threads=threads)
 
 if __name__ == "__main__":
     main()
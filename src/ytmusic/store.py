@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Persistent track-resolution store for the YouTube Music search service
+Keeps normalized query -> search result mappings in SQLite (WAL mode) so
+they survive server restarts
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """SQLite-backed key -> result store with write-behind batching"""
+
+    def __init__(self, path: str, max_entries: int = 50000, ttl: float = 604800,
+                 flush_interval: float = 1.0, batch_size: int = 256,
+                 compact_interval: float = 600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.compact_interval = compact_interval
+
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stop = threading.Event()
+        self._last_compact = time.monotonic()
+
+        self.reads = 0
+        self.hits = 0
+        self.writes = 0
+        self.flushes = 0
+        self.compactions = 0
+        self.write_errors = 0
+
+        conn = self._connection()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_updated_at ON results (updated_at)")
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections are not shareable across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, allow_expired: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the stored result for key, or None if missing or (unless allowed) older than the TTL"""
+        self.reads += 1
+        try:
+            row = self._connection().execute(
+                "SELECT value, updated_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Result store read failed: {e}")
+            return None
+
+        if not row or (not allow_expired and self.ttl > 0 and row[1] + self.ttl < time.time()):
+            return None
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Queue a write; the request thread never waits on disk"""
+        self._queue.put((key, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def _write_loop(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch:
+                self._write_batch(batch)
+
+            if time.monotonic() - self._last_compact >= self.compact_interval:
+                self.compact()
+
+    def _write_batch(self, batch) -> None:
+        conn = self._connection()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (key, value, updated_at) VALUES (?, ?, ?)", batch
+            )
+            conn.commit()
+            self.writes += len(batch)
+            self.flushes += 1
+        except sqlite3.Error as e:
+            self.write_errors += len(batch)
+            logger.error(f"Result store write failed: {e}")
+
+    def compact(self) -> None:
+        """Drop expired rows, trim to max_entries (oldest first) and release free pages"""
+        self._last_compact = time.monotonic()
+        conn = self._connection()
+        try:
+            if self.ttl > 0:
+                conn.execute("DELETE FROM results WHERE updated_at < ?", (time.time() - self.ttl,))
+            if self.max_entries > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            conn.commit()
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.compactions += 1
+        except sqlite3.Error as e:
+            logger.error(f"Result store compaction failed: {e}")
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        self._stop.set()
+        self._writer.join(timeout=self.flush_interval + 5)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            size = self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {
+            "path": self.path,
+            "size": size,
+            "maxEntries": self.max_entries,
+            "ttl": self.ttl,
+            "reads": self.reads,
+            "hits": self.hits,
+            "writes": self.writes,
+            "pendingWrites": self._queue.qsize(),
+            "flushes": self.flushes,
+            "compactions": self.compactions,
+            "writeErrors": self.write_errors
+        }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Adaptive ordering of the upstream search strategies
+Queries are grouped into patterns by script (the Unicode ranges normalize_query keeps) and by
+markers such as "remix", "live" or "ft". For each pattern the planner counts how often every
+strategy returned usable results and skips strategies that practically never help, so fewer
+upstream calls are spent per resolved query. The priority order itself is never changed: a
+fallback is only tried after the strategies before it missed, so its hit rate says nothing about
+how it would do first, and returning something is not the same as returning the right kind of result.
+"""
+
+import threading
+from typing import Any, Dict, List
+
+# Upstream search strategies, in their static priority order
+SEARCH_STRATEGIES = [
+    {'filter': 'songs', 'limit': 5},
+    {'filter': 'videos', 'limit': 3},
+    {'filter': None, 'limit': 2}
+]
+
+STRATEGY_ORDERS = ('adaptive', 'static')
+
+# Same ranges as YTMusicSearcher.normalize_query; anything else counts as latin
+SCRIPTS = (
+    ('cyrillic', '\u0400', '\u04FF'),
+    ('arabic', '\u0600', '\u06FF'),
+    ('cjk', '\u4E00', '\u9FFF'),
+    ('kana', '\u3040', '\u30FF'),
+    ('hangul', '\uAC00', '\uD7AF'),
+)
+
+MARKERS = {
+    'remix': ('remix', 'remixed', 'mix'),
+    'live': ('live', 'concert', 'unplugged'),
+    'feat': ('ft', 'feat', 'featuring'),
+    'cover': ('cover', 'karaoke', 'instrumental'),
+}
+
+
+def strategy_label(strategy: Dict[str, Any]) -> str:
+    return strategy.get('filter') or 'all'
+
+
+def query_script(query: str) -> str:
+    """Script most of the query's non-ASCII letters are written in"""
+    counts: Dict[str, int] = {}
+    for char in query:
+        if char < '\u0400':
+            continue
+        for name, first, last in SCRIPTS:
+            if first <= char <= last:
+                counts[name] = counts.get(name, 0) + 1
+                break
+    if not counts:
+        return 'latin'
+    return max(counts, key=counts.__getitem__)
+
+
+def query_pattern(search_query: str) -> str:
+    """Pattern of a normalized query, e.g. "latin", "cjk" or "latin+feat+remix\""""
+    words = set(search_query.lower().split())
+    markers = [name for name, marker_words in MARKERS.items() if words.intersection(marker_words)]
+    return '+'.join([query_script(search_query)] + sorted(markers))
+
+
+class StrategyPlanner:
+    """Per-pattern strategy hit rates and the strategies they suggest skipping"""
+
+    def __init__(self, strategies: List[Dict[str, Any]], adaptive: bool = True, min_samples: int = 20,
+                 skip_below: float = 0.02, explore_every: int = 50):
+        self.strategies = strategies
+        self.adaptive = adaptive
+        self.min_samples = min_samples
+        self.skip_below = skip_below
+        # Every explore_every-th resolution of a pattern runs the static order to keep its counts fresh
+        self.explore_every = explore_every
+        self._patterns: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _pattern(self, pattern: str) -> Dict[str, Any]:
+        stats = self._patterns.get(pattern)
+        if stats is None:
+            stats = self._patterns[pattern] = {
+                "resolutions": 0,
+                "explored": 0,
+                "attempts": {strategy_label(strategy): 0 for strategy in self.strategies},
+                "wins": {strategy_label(strategy): 0 for strategy in self.strategies}
+            }
+        return stats
+
+    def _useful(self, stats: Dict[str, Any], label: str) -> bool:
+        """False once a strategy has been tried often enough and practically never returned results"""
+        attempts = stats["attempts"][label]
+        return attempts < self.min_samples or stats["wins"][label] / attempts >= self.skip_below
+
+    def _order(self, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if stats["resolutions"] < self.min_samples:
+            return list(self.strategies)
+
+        kept = [strategy for strategy in self.strategies if self._useful(stats, strategy_label(strategy))]
+        return kept or self.strategies[:1]
+
+    def plan(self, pattern: str) -> List[Dict[str, Any]]:
+        """Strategies to try for one resolution of a query of this pattern, in order"""
+        with self._lock:
+            stats = self._pattern(pattern)
+            stats["resolutions"] += 1
+            if not self.adaptive:
+                return self.strategies
+            if stats["resolutions"] % self.explore_every == 0:
+                stats["explored"] += 1
+                return list(self.strategies)
+            return self._order(stats)
+
+    def record(self, pattern: str, strategy: Dict[str, Any], useful: bool) -> None:
+        """Count one completed upstream call of strategy and whether it returned usable results"""
+        label = strategy_label(strategy)
+        with self._lock:
+            stats = self._pattern(pattern)
+            if label not in stats["attempts"]:
+                return
+            stats["attempts"][label] += 1
+            if useful:
+                stats["wins"][label] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            patterns = {
+                pattern: {
+                    "resolutions": stats["resolutions"],
+                    "explored": stats["explored"],
+                    "plan": [strategy_label(strategy) for strategy in
+                             (self._order(stats) if self.adaptive else self.strategies)],
+                    "strategies": {
+                        label: {
+                            "attempts": attempts,
+                            "wins": stats["wins"][label],
+                            "hitRate": round(stats["wins"][label] / attempts, 3) if attempts else 0.0
+                        }
+                        for label, attempts in stats["attempts"].items()
+                    }
+                }
+                for pattern, stats in self._patterns.items()
+            }
+        return {
+            "order": "adaptive" if self.adaptive else "static",
+            "minSamples": self.min_samples,
+            "skipBelow": self.skip_below,
+            "patterns": patterns
+        }
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Cover art resolution for the YouTube Music search service
+Picks the largest thumbnail, derives higher-resolution variants of its URL and verifies them in
+the background. The best variant that actually exists is cached per videoId, so later lookups of
+the same track get a cover that is known to load.
+"""
+
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# lh3.googleusercontent.com covers are resized on request, so any size can be asked for
+RESIZE_PATTERN = re.compile(r'w\d+-h\d+')
+# i.ytimg.com video stills only exist in a fixed set of sizes, maxres not always among them
+YTIMG_PATTERN = re.compile(r'(mq|hq)default')
+YTIMG_FALLBACKS = ('sddefault', 'hqdefault')
+
+# Returns whether the URL exists; raises on transport errors
+Fetcher = Callable[[str], bool]
+
+
+def best_thumbnail(thumbnails: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Largest thumbnail by area in one pass; the first one wins ties"""
+    if not thumbnails:
+        return None
+    return max(thumbnails, key=lambda x: x.get('width', 0) * x.get('height', 0))
+
+
+def upgrade_url(url: str) -> str:
+    """Highest-resolution variant of url, assuming it exists"""
+    url = RESIZE_PATTERN.sub('w1080-h1080', url)
+    if 'mqdefault' in url:
+        return url.replace('mqdefault', 'maxresdefault')
+    if 'hqdefault' in url:
+        return url.replace('hqdefault', 'maxresdefault')
+    return url
+
+
+def upgrade_candidates(url: str) -> List[str]:
+    """Variants of url in preference order, ending with url itself"""
+    best = upgrade_url(url)
+    candidates = [best]
+    if YTIMG_PATTERN.search(url):
+        candidates += [best.replace('maxresdefault', variant) for variant in YTIMG_FALLBACKS]
+    return list(dict.fromkeys(candidates + [url]))
+
+
+def provisional_url(url: str) -> str:
+    """What to serve before verification: resizes are always served, fixed-size upgrades may 404"""
+    return RESIZE_PATTERN.sub('w1080-h1080', url)
+
+
+class HttpFetcher:
+    """Checks URLs with HEAD requests on a shared session"""
+
+    def __init__(self, session, timeout: float = 3.0):
+        self.session = session
+        self.timeout = timeout
+
+    def __call__(self, url: str) -> bool:
+        response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        return response.status_code == 200
+
+
+class ThumbnailResolver:
+    """Per-videoId cover cache; unverified covers are checked on a small background pool"""
+
+    def __init__(self, fetcher: Optional[Fetcher] = None, maxsize: int = 8192,
+                 ttl: float = 86400, retry_after: float = 300, workers: int = 2):
+        self.fetcher = fetcher
+        # Negative entries hold a provisional URL after a failed check, retried after retry_after
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, negative_ttl=retry_after)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        if fetcher is not None:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ytmusic-thumbnail')
+        self.verified = 0
+        self.downgraded = 0
+        self.errors = 0
+
+    def resolve(self, video_id: Optional[str], thumbnails: List[Dict[str, Any]]) -> Optional[str]:
+        """Best known cover URL for a result, scheduling verification on first sight"""
+        if video_id:
+            cached = self.cache.get(video_id)
+            if cached is not None:
+                return cached
+
+        best = best_thumbnail(thumbnails)
+        if best is None:
+            return None
+        url = best.get('url', '')
+        if not url or self._executor is None:
+            return upgrade_url(url)
+
+        if video_id:
+            self._schedule(video_id, url)
+        return provisional_url(url)
+
+    def lookup(self, video_id: Optional[str]) -> Optional[str]:
+        """Cached cover for video_id, without scheduling anything"""
+        return self.cache.get(video_id) if video_id else None
+
+    def _schedule(self, video_id: str, url: str) -> None:
+        with self._lock:
+            if video_id in self._pending:
+                return
+            self._pending.add(video_id)
+        try:
+            self._executor.submit(self._verify, video_id, url)
+        except RuntimeError:
+            # Executor shut down at exit
+            with self._lock:
+                self._pending.discard(video_id)
+
+    def _verify(self, video_id: str, url: str) -> None:
+        candidates = upgrade_candidates(url)
+        try:
+            for index, candidate in enumerate(candidates[:-1]):
+                if self.fetcher(candidate):
+                    break
+            else:
+                # The URL upstream handed out is assumed to exist
+                index, candidate = len(candidates) - 1, candidates[-1]
+
+            self.cache.set(video_id, candidate)
+            if index == 0:
+                self.verified += 1
+            else:
+                self.downgraded += 1
+        except Exception as e:
+            self.errors += 1
+            self.cache.set(video_id, provisional_url(url), negative=True)
+            logger.error(f"Thumbnail check failed for {video_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(video_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "verify": self._executor is not None,
+            "cached": len(self.cache),
+            "pending": len(self._pending),
+            "verified": self.verified,
+            "downgraded": self.downgraded,
+            "errors": self.errors
+        }
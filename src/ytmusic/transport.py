@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Upstream HTTP transport for the YTMusic client
+A pooled, thread-safe requests session with default timeouts and jittered retries
+"""
+
+import os
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class UpstreamSession(requests.Session):
+    """requests session that applies (connect, read) timeouts to every call without one"""
+
+    def __init__(self, connect_timeout: float, read_timeout: float):
+        super().__init__()
+        self.timeout = (connect_timeout, read_timeout)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def build_retry(retries: int, backoff: float, jitter: float) -> Retry:
+    """Retry connection failures and 429/5xx answers; read timeouts are not retried"""
+    options = dict(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,  # YouTube Music searches are POSTs but safe to repeat
+        backoff_factor=backoff,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    try:
+        return Retry(backoff_jitter=jitter, **options)
+    except TypeError:
+        # urllib3 < 2 has no backoff_jitter
+        return Retry(**options)
+
+
+def build_session(pool_size: int) -> UpstreamSession:
+    """Session for YTMusic(requests_session=...), configured from YTMUSIC_* variables"""
+    session = UpstreamSession(
+        connect_timeout=float(os.environ.get('YTMUSIC_CONNECT_TIMEOUT', 3.05)),
+        read_timeout=float(os.environ.get('YTMUSIC_READ_TIMEOUT', 10))
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max(1, pool_size),
+        max_retries=build_retry(
+            retries=int(os.environ.get('YTMUSIC_RETRIES', 2)),
+            backoff=float(os.environ.get('YTMUSIC_RETRY_BACKOFF', 0.3)),
+            jitter=float(os.environ.get('YTMUSIC_RETRY_JITTER', 0.2))
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.pool_size = pool_size
+    return session
+
+
+def connection_stats(session: requests.Session) -> Dict[str, Any]:
+    """Connection reuse across the session's urllib3 pools"""
+    connections = 0
+    requests_sent = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+
+    return {
+        "poolSize": getattr(session, 'pool_size', None),
+        "timeout": list(getattr(session, 'timeout', ())) or None,
+        "connectionsOpened": connections,
+        "requests": requests_sent,
+        "reuseRate": round(1 - connections / requests_sent, 3) if requests_sent else None
+    }
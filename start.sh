@@ -71,12 +71,12 @@ cd "$PROJECT_ROOT/src/ytmusic"
 python3 server.py >/dev/null 2>&1 &
 API_SERVER_PID=$!
 
-# Test API server
-for i in {1..5}; do
-    if curl -s http://127.0.0.1:8080/health > /dev/null 2>&1; then
+# Wait until the API server reports ready (/health answers 503 until it is)
+for i in {1..15}; do
+    if curl -sf --max-time 2 http://127.0.0.1:8080/health > /dev/null 2>&1; then
         break
     fi
-    if [ $i -eq 5 ]; then
+    if [ $i -eq 15 ]; then
         echo "❌ Failed to start YouTube Music API server"
         cleanup
         exit 1